@@ -0,0 +1,133 @@
+import ast
+from typing import Any, Dict, List, NamedTuple, Optional
+from delivery import DEFAULT_PRIORITY
+from logging_config import setup_logger
+
+logger = setup_logger('alert_rules')
+
+# Правила проверяются сверху вниз, срабатывает первое подходящее.
+# when — выражение на полях RULE_FIELDS: сравнения, and/or/not, in.
+# action: send — отдельное сообщение (меньше priority — раньше в очереди),
+#         digest — в сводку по подарку, drop — не отправлять.
+ALERT_RULES = [
+    {'name': 'very_rare', 'when': 'rarest < 0.5', 'action': 'send', 'priority': 0},
+    {'name': 'rare', 'when': "rarest < 1 or backdrop_name in ('onyx black', 'black')", 'action': 'send', 'priority': 1},
+    {'name': 'default', 'when': 'True', 'action': 'send', 'priority': DEFAULT_PRIORITY},
+]
+
+ACTIONS = ('send', 'digest', 'drop')
+# Процент для отсутствующей характеристики: она не делает подарок редким
+MISSING_PERCENT = 100.0
+
+RULE_FIELDS = {
+    'gift': 'название подарка в нижнем регистре',
+    'num': 'номер',
+    'model': '% модели', 'backdrop': '% фона', 'symbol': '% символа',
+    'model_name': 'модель', 'backdrop_name': 'фон', 'symbol_name': 'символ',
+    'rarest': 'наименьший % среди характеристик',
+    'price_ton': 'цена в TON, 0 если неизвестна', 'price_usdt': 'цена в USDT', 'price_rub': 'цена в RUB',
+    'issued': 'выпущено', 'total': 'всего',
+    'owner': 'username или имя владельца в нижнем регистре', 'has_owner': 'владелец указан',
+}
+
+ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub,
+    ast.Compare, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq, ast.In, ast.NotIn,
+    ast.Name, ast.Load, ast.Constant, ast.Tuple, ast.List,
+)
+
+
+class AlertDecision(NamedTuple):
+    rule: str
+    action: str
+    priority: int
+
+
+DEFAULT_DECISION = AlertDecision('default', 'send', DEFAULT_PRIORITY)
+
+
+def compile_condition(source: str):
+    """Проверяет выражение правила и компилирует его один раз"""
+    tree = ast.parse(source, mode='eval')
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_NODES):
+            raise ValueError(f"Недопустимая конструкция в правиле '{source}': {type(node).__name__}")
+        if isinstance(node, ast.Name) and node.id not in RULE_FIELDS and node.id not in ('True', 'False'):
+            raise ValueError(f"Неизвестное поле '{node.id}' в правиле '{source}'")
+    return compile(tree, f'<rule {source}>', 'eval')
+
+
+def rule_fields(gift_name: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Поля для правил из результата Parcer.fetch"""
+    fields = {
+        'gift': gift_name.lower(),
+        'num': int(result.get('num') or 0),
+        'model': MISSING_PERCENT, 'backdrop': MISSING_PERCENT, 'symbol': MISSING_PERCENT,
+        'model_name': '', 'backdrop_name': '', 'symbol_name': '',
+        'rarest': MISSING_PERCENT,
+        'price_ton': 0.0, 'price_usdt': 0.0, 'price_rub': 0.0,
+        'issued': 0, 'total': 0,
+        'owner': '', 'has_owner': False,
+    }
+    record = result.get('record')
+    if record is not None:
+        for field, name, percent in (('model', record.model, record.model_percent),
+                                     ('backdrop', record.backdrop, record.backdrop_percent),
+                                     ('symbol', record.symbol, record.symbol_percent)):
+            if name:
+                fields[field + '_name'] = name.lower()
+            if percent is not None:
+                fields[field] = percent
+        fields['rarest'] = min((percent for _, _, percent in record.characteristics if percent is not None),
+                               default=MISSING_PERCENT)
+    price_info = result.get('price_info')
+    if price_info and price_info.get('average_price'):
+        for currency, value in price_info['average_price'].items():
+            if value:
+                fields['price_' + currency] = value
+    if record is not None and record.issued is not None:
+        fields['issued'], fields['total'] = record.issued, record.total
+    owner_info = record.owner if record is not None else None
+    if owner_info and owner_info.get('name'):
+        fields['owner'] = (owner_info.get('username') or owner_info['name']).lower()
+        fields['has_owner'] = True
+    return fields
+
+
+class AlertRules:
+    """Правила маршрутизации находок, скомпилированные один раз при создании"""
+
+    def __init__(self, rules: List[Dict[str, Any]]):
+        self.rules = []
+        for rule in rules:
+            action = rule.get('action', 'send')
+            if action not in ACTIONS:
+                raise ValueError(f"Неизвестное действие '{action}' в правиле {rule.get('name')}")
+            decision = AlertDecision(rule.get('name', rule['when']), action, rule.get('priority', DEFAULT_PRIORITY))
+            self.rules.append((compile_condition(rule['when']), decision))
+        self.matches: Dict[str, int] = {}
+
+    def evaluate(self, gift_name: str, result: Dict[str, Any]) -> AlertDecision:
+        fields = rule_fields(gift_name, result)
+        decision = DEFAULT_DECISION
+        for code, rule_decision in self.rules:
+            try:
+                matched = eval(code, {'__builtins__': {}}, fields)
+            except Exception as e:
+                logger.error(f"❌ Ошибка правила {rule_decision.rule}: {e}")
+                continue
+            if matched:
+                decision = rule_decision
+                break
+        self.matches[decision.rule] = self.matches.get(decision.rule, 0) + 1
+        return decision
+
+
+_rules: Optional[AlertRules] = None
+
+
+def get_alert_rules() -> AlertRules:
+    global _rules
+    if _rules is None:
+        _rules = AlertRules(ALERT_RULES)
+    return _rules
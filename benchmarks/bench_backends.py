@@ -0,0 +1,48 @@
+"""Скорость HTML бэкендов на сохранённых страницах t.me.
+
+Совпадение результатов с эталонным BeautifulSoup проверяет
+tests/test_html_backends.py.
+
+Запуск из корня проекта:
+    python benchmarks/bench_backends.py -n 300
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from html_backends import available_backends, get_backend
+
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+
+
+def load_pages():
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES, 'tme_*.html'))):
+        with open(path, encoding='utf-8') as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--iterations', type=int, default=300)
+    args = parser.parse_args()
+
+    pages = load_pages()
+    for name in available_backends():
+        backend = get_backend(name)
+        start = time.process_time()
+        for _ in range(args.iterations):
+            for text in pages.values():
+                backend.parse(text)
+        per_page = (time.process_time() - start) / (args.iterations * len(pages)) * 1e6
+        print(f"{name:<12} {per_page:9.1f} мкс CPU на страницу")
+
+
+if __name__ == '__main__':
+    main()
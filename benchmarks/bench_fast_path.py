@@ -0,0 +1,62 @@
+"""CPU на одну пустую страницу: полный разбор BeautifulSoup против быстрой проверки <title>.
+
+Запуск из корня проекта:
+    python benchmarks/bench_fast_path.py -n 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bs4 import BeautifulSoup
+from parcer import sniff_gift_page
+
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+
+
+def load_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+
+def check_full_parse(content: bytes) -> bool:
+    soup = BeautifulSoup(content.decode('utf-8', errors='replace'), 'html.parser')
+    title = soup.title.string if soup.title else ''
+    return bool(title) and "gift" in title.lower()
+
+
+def check_fast_path(content: bytes) -> bool:
+    is_gift = sniff_gift_page(content)
+    if is_gift is None:
+        return check_full_parse(content)
+    return is_gift
+
+
+def measure(check, content: bytes, iterations: int) -> float:
+    """Возвращает CPU-время на одну проверку в микросекундах"""
+    start = time.process_time()
+    for _ in range(iterations):
+        check(content)
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    for fixture in ('tme_miss.html', 'tme_gift.html'):
+        content = load_fixture(fixture)
+        assert check_full_parse(content) == check_fast_path(content), fixture
+        before = measure(check_full_parse, content, args.iterations)
+        after = measure(check_fast_path, content, args.iterations)
+        print(f"{fixture:<16} {len(content):>6} байт  "
+              f"BeautifulSoup: {before:9.1f} мкс  быстрая проверка: {after:7.2f} мкс  "
+              f"x{before / after:,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Задержка event loop и пропускная способность разбора с пулом процессов и без него.
+
+Страницы из benchmarks/fixtures подаются в ParsePool волнами по -c штук, а
+параллельно тикер каждые --tick мс проверяет, насколько цикл опаздывает
+с пробуждением. 0 воркеров — разбор прямо в цикле, как без пула.
+
+Запуск из корня проекта:
+    python benchmarks/bench_parse_pool.py -n 2000 -c 50 --workers 0 1 2 4
+    python benchmarks/bench_parse_pool.py --json > bench_output.txt
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from parse_pool import ParsePool
+
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+
+
+def load_pages():
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, 'tme_*.html'))):
+        with open(path, 'rb') as f:
+            pages.append(f.read())
+    return pages
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def lag_probe(tick: float, lags, stop: asyncio.Event):
+    """Опоздание пробуждения относительно заказанного sleep"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(tick)
+        lags.append(max(0.0, time.perf_counter() - started - tick))
+
+
+async def bench(pages, workers: int, iterations: int, concurrency: int, batch_size: int,
+                tick: float, backend: str):
+    pool = ParsePool(backend, {'workers': workers, 'batch_size': batch_size})
+    await pool.start()
+    if workers and pool.executor is None:
+        return None
+    try:
+        # Прогрев: импорт бэкенда и первые пачки в каждом воркере
+        await asyncio.gather(*(pool.parse(page) for page in pages * max(1, workers)))
+        lags = []
+        stop = asyncio.Event()
+        probe = asyncio.create_task(lag_probe(tick, lags, stop))
+        started = time.perf_counter()
+        for wave_start in range(0, iterations, concurrency):
+            wave = range(wave_start, min(wave_start + concurrency, iterations))
+            await asyncio.gather(*(pool.parse(pages[i % len(pages)]) for i in wave))
+        wall = time.perf_counter() - started
+        stop.set()
+        await probe
+        return {
+            'workers': workers,
+            'backend': pool.name,
+            'pages': iterations,
+            'pages_per_sec': iterations / wall if wall else 0.0,
+            'batches': pool.batches,
+            'lag_p50_ms': statistics.median(lags) * 1e3 if lags else 0.0,
+            'lag_p99_ms': percentile(lags, 0.99) * 1e3 if lags else 0.0,
+            'lag_max_ms': max(lags) * 1e3 if lags else 0.0,
+        }
+    finally:
+        pool.close()
+
+
+async def run(args):
+    pages = load_pages()
+    results = []
+    for workers in args.workers:
+        result = await bench(pages, workers, args.iterations, args.concurrency, args.batch_size,
+                             args.tick / 1e3, args.backend)
+        if result is None:
+            print(f"пул недоступен на этой платформе, {workers} воркеров пропущено", file=sys.stderr)
+            continue
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--iterations', type=int, default=2000)
+    parser.add_argument('-c', '--concurrency', type=int, default=50, help='страниц в одной волне')
+    parser.add_argument('--workers', type=int, nargs='+', default=[0, 1, 2, 4])
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--tick', type=float, default=1.0, help='период тикера задержки, мс')
+    parser.add_argument('--backend', default=None, help='bs4 / lxml / selectolax / auto')
+    parser.add_argument('--json', action='store_true', help='вывести результат в JSON')
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"{'воркеров':<10}{'бэкенд':<18}{'стр/с':>10}{'пачек':>8}{'лаг p50':>10}{'лаг p99':>10}{'лаг max':>10}")
+    for r in results:
+        print(f"{r['workers']:<10}{r['backend']:<18}{r['pages_per_sec']:>10.1f}{r['batches']:>8}"
+              f"{r['lag_p50_ms']:>10.2f}{r['lag_p99_ms']:>10.2f}{r['lag_max_ms']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""Офлайн-бенчмарк конвейера fetch → parse → format без выхода в сеть.
+
+Сохранённые страницы t.me/nft и telegifter.ru из benchmarks/fixtures
+отдаёт локальный aiohttp сервер, а Parcer ходит к нему вместо t.me.
+Для каждой стадии выводятся страницы/с, p50/p99, CPU и пик памяти на вызов.
+
+Запуск из корня проекта:
+    python benchmarks/bench_pipeline.py -n 500 -c 20 --hit-ratio 0.1
+    python benchmarks/bench_pipeline.py --json > bench_output.txt
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from aiohttp import web
+import http_client
+import parcer as parcer_module
+from html_backends import get_backend
+from parcer import Parcer, sniff_gift_page
+
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+GIFT_SLUG = 'CookieHeart'
+FRONTIER = 1_000_000
+
+
+def read_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+
+class StandInServer:
+    """Отдаёт фикстуры вместо t.me и telegifter.ru"""
+
+    def __init__(self):
+        self.gift_pages = [read_fixture(os.path.basename(path))
+                           for path in sorted(glob.glob(os.path.join(FIXTURES, 'tme_gift*.html')))]
+        self.miss_page = read_fixture('tme_miss.html')
+        self.price_page = read_fixture('telegifter_gift.html')
+        self.runner = None
+        self.port = None
+
+    async def nft_page(self, request: web.Request) -> web.Response:
+        num = int(request.match_info['num'])
+        body = self.gift_pages[num % len(self.gift_pages)] if num <= FRONTIER else self.miss_page
+        return web.Response(body=body, content_type='text/html', charset='utf-8')
+
+    async def price(self, request: web.Request) -> web.Response:
+        return web.Response(body=self.price_page, content_type='text/html', charset='utf-8')
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/nft/{slug}-{num:\\d+}', self.nft_page)
+        app.router.add_get('/gifts/{slug}/', self.price)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(stage: str, latencies, wall: float, cpu: float, peak_bytes: int):
+    count = len(latencies)
+    return {
+        'stage': stage,
+        'calls': count,
+        'per_sec': count / wall if wall else 0.0,
+        'p50_ms': statistics.median(latencies) * 1e3,
+        'p99_ms': percentile(latencies, 0.99) * 1e3,
+        'cpu_us': cpu / count * 1e6,
+        'peak_kib': peak_bytes / 1024,
+    }
+
+
+def peak_memory(func, *args) -> int:
+    """Пик памяти одного вызова по tracemalloc"""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+async def peak_memory_async(func, *args) -> int:
+    """Пик памяти одного await по tracemalloc; в цикле крутится и сервер-заглушка, его ответ тоже в пике"""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        await func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_sync(stage: str, func, inputs, iterations: int):
+    latencies = []
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for i in range(iterations):
+        args = inputs[i % len(inputs)]
+        started = time.perf_counter()
+        func(*args)
+        latencies.append(time.perf_counter() - started)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    return summarize(stage, latencies, wall, cpu, peak_memory(func, *inputs[0]))
+
+
+async def bench_fetch(parcer: Parcer, base_url: str, iterations: int, concurrency: int, hit_ratio: float):
+    numbers = [random.randint(1, FRONTIER) if random.random() < hit_ratio else FRONTIER + i + 1
+               for i in range(iterations)]
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(num: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await parcer.fetch(str(num), base_url)
+            latencies.append(time.perf_counter() - started)
+
+    # Прогрев пула соединений и кэша цен
+    await parcer.fetch('1', base_url)
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one(num) for num in numbers))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    # Память меряем отдельным вызовом: под tracemalloc задержки основного прогона были бы завышены
+    peak = await peak_memory_async(parcer.fetch, str(FRONTIER // 2), base_url)
+    return summarize(f'fetch (hit {hit_ratio:.0%})', latencies, wall, cpu, peak)
+
+
+async def run(args):
+    server = StandInServer()
+    await server.start()
+    base = f'http://127.0.0.1:{server.port}'
+    results = []
+    try:
+        async with Parcer(html_backend=args.backend) as parcer:
+            parcer.price_parser.base_url = f'{base}/gifts/'
+            base_url = f'{base}/nft/{GIFT_SLUG}-'
+            results.append(await bench_fetch(parcer, base_url, args.iterations, args.concurrency, args.hit_ratio))
+
+            raw_pages = server.gift_pages + [server.miss_page]
+            results.append(bench_sync('sniff', sniff_gift_page, [(page,) for page in raw_pages], args.iterations))
+
+            backend = get_backend(args.backend)
+            texts = [page.decode('utf-8') for page in server.gift_pages]
+            results.append(bench_sync(f'parse ({backend.name})', backend.parse, [(text,) for text in texts], args.iterations))
+
+            gift_name = parcer.extract_gift_name(base_url)
+            price_info = await parcer.get_price_info(gift_name, None)
+            parsed = [backend.parse(text) for text in texts]
+            message_inputs = [
+                (gift_name, str(i), record.characteristics, price_info, record.issued_info,
+                 record.owner, f'{base_url}{i}')
+                for i, record in enumerate(parsed, 1)
+            ]
+            results.append(bench_sync('format_message', parcer.format_message, message_inputs, args.iterations))
+
+            keyboard_inputs = [(f'{base_url}{i}', record.owner, price_info) for i, record in enumerate(parsed, 1)]
+            results.append(bench_sync('keyboard', parcer.create_keyboard_with_show_gift, keyboard_inputs, args.iterations))
+    finally:
+        await http_client.close_session()
+        await server.stop()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--iterations', type=int, default=500)
+    parser.add_argument('-c', '--concurrency', type=int, default=20)
+    parser.add_argument('--hit-ratio', type=float, default=0.1, help='доля существующих номеров в fetch')
+    parser.add_argument('--backend', default=None, help='bs4 / lxml / selectolax / auto')
+    parser.add_argument('--json', action='store_true', help='вывести результат в JSON')
+    args = parser.parse_args()
+
+    random.seed(0)
+    parcer_module.price_cache.clear()
+    results = asyncio.run(run(args))
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+    print(f"{'стадия':<22}{'вызовов':>9}{'в сек':>11}{'p50 мс':>9}{'p99 мс':>9}{'CPU мкс':>10}{'пик КиБ':>9}")
+    for r in results:
+        print(f"{r['stage']:<22}{r['calls']:>9}{r['per_sec']:>11.1f}{r['p50_ms']:>9.3f}"
+              f"{r['p99_ms']:>9.3f}{r['cpu_us']:>10.1f}{r['peak_kib']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
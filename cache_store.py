@@ -0,0 +1,74 @@
+import json
+import sqlite3
+import time
+from typing import Any, Dict, Optional, Tuple
+from logging_config import setup_logger
+
+logger = setup_logger('cache_store')
+
+# Записи старше этого срока при открытии удаляются совсем
+MAX_ENTRY_AGE = 7 * 24 * 3600
+
+
+class CacheStore:
+    """Кэш в SQLite, переживающий перезапуск; срок жизни проверяют вызывающие"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            ' namespace TEXT NOT NULL,'
+            ' key TEXT NOT NULL,'
+            ' value TEXT NOT NULL,'
+            ' updated REAL NOT NULL,'
+            ' PRIMARY KEY (namespace, key))'
+        )
+
+    def set(self, namespace: str, key: str, value: Any, updated: Optional[float] = None):
+        try:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO cache (namespace, key, value, updated) VALUES (?, ?, ?, ?)',
+                (namespace, key, json.dumps(value, ensure_ascii=False), updated or time.time())
+            )
+        except Exception as e:
+            logger.error(f"❌ Ошибка записи в кэш {namespace}/{key}: {e}")
+
+    def load(self, namespace: str) -> Dict[str, Tuple[Any, float]]:
+        """Все записи пространства имён в виде {key: (value, updated)}"""
+        rows = self.conn.execute('SELECT key, value, updated FROM cache WHERE namespace = ?', (namespace,))
+        return {key: (json.loads(value), updated) for key, value, updated in rows}
+
+    def purge(self, max_age: float = MAX_ENTRY_AGE) -> int:
+        cursor = self.conn.execute('DELETE FROM cache WHERE updated < ?', (time.time() - max_age,))
+        return cursor.rowcount
+
+    def close(self):
+        self.conn.close()
+
+
+_store: Optional[CacheStore] = None
+
+
+def open_store(path: str) -> CacheStore:
+    global _store
+    if _store is None:
+        _store = CacheStore(path)
+        removed = _store.purge()
+        if removed:
+            logger.info(f"🧹 Удалено {removed} устаревших записей кэша")
+    return _store
+
+
+def get_store() -> Optional[CacheStore]:
+    """Открытый кэш или None, если процесс работает без постоянного кэша"""
+    return _store
+
+
+def close_store():
+    global _store
+    if _store is not None:
+        _store.close()
+    _store = None
@@ -1,14 +1,6 @@
 from pydantic_settings import BaseSettings
 import os
-from typing import List, Optional
-from dotenv import load_dotenv
-
-load_dotenv()
-
-class Settings(BaseSettings):
-    TELEGRAM_BOT_TOKEN: str = os.getenv("TELEfrom pydantic_settings import BaseSettings
-import os
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,47 +8,16 @@ load_dotenv()
 class Settings(BaseSettings):
     TELEGRAM_BOT_TOKEN: str = os.getenv("TELEGRAM_BOT_TOKEN")
     
-    # Additional tokens are ignored now – we use only the main one
-    TELEGRAM_BOT_TOKEN_2: Optional[str] = os.getenv("TELEGRAM_BOT_TOKEN_2", "")
-    TELEGRAM_BOT_TOKEN_3: Optional[str] = os.getenv("TELEGRAM_BOT_TOKEN_3", "")
-    TELEGRAM_BOT_TOKEN_4: Optional[str] = os.getenv("TELEGRAM_BOT_TOKEN_4", "")
-    TELEGRAM_BOT_TOKEN_5: Optional[str] = os.getenv("TELEGRAM_BOT_TOKEN_5", "")
-    
-    class Config:
-        env_file = ".env"
-        extra = "allow"
-
-settings = Settings()
-
-# ID чата для отправки сообщений
-CHAT_ID = ""
-
-# Настройки мониторинга
-MONITORING_SETTINGS = {
-    'rate_limit_per_second': 0.1,
-    'timeout': 20,
-}
-
-def get_all_bot_tokens() -> List[str]:
-    """Возвращает только основной токен (используем одного бота)"""
-    tokens = []
-    if settings.TELEGRAM_BOT_TOKEN:
-        tokens.append(settings.TELEGRAM_BOT_TOKEN)
-    return tokens
-
-BOT_TOKENS = get_all_bot_tokens()
-
-if not BOT_TOKENS:
-    print("❌ ОШИБКА: Не найден токен бота в .env файле!")
-    print("Добавьте TELEGRAM_BOT_TOKEN=ваш_токен")
-    exit(1)GRAM_BOT_TOKEN")
-    
     # Дополнительные токены ботов
     TELEGRAM_BOT_TOKEN_2: Optional[str] = os.getenv("TELEGRAM_BOT_TOKEN_2", "")
     TELEGRAM_BOT_TOKEN_3: Optional[str] = os.getenv("TELEGRAM_BOT_TOKEN_3", "")
     TELEGRAM_BOT_TOKEN_4: Optional[str] = os.getenv("TELEGRAM_BOT_TOKEN_4", "")
     TELEGRAM_BOT_TOKEN_5: Optional[str] = os.getenv("TELEGRAM_BOT_TOKEN_5", "")
     
+    # Шардирование: несколько процессов с разными SHARD_ID делят подарки через общую базу
+    SHARD_ID: Optional[str] = os.getenv("SHARD_ID", "")
+    SHARD_DB: str = os.getenv("SHARD_DB", "shards.db")
+    
     class Config:
         env_file = ".env"
         extra = "allow"
@@ -65,6 +26,11 @@ settings = Settings()
 
 # ID чата для отправки сообщений
 CHAT_ID = ""  # Замените на ваш ID чата
+# Дополнительные чаты, куда дублируются отдельные находки (сводки и служебные сообщения — только в CHAT_ID)
+EXTRA_CHAT_IDS: List[str] = []
+# Свои лимиты отправки в отдельные чаты: {chat_id: (сообщений в секунду, burst)}.
+# Без записи группы (отрицательный id) получают 20 в минуту, личные чаты — 1 в секунду
+CHAT_RATES: Dict[str, Tuple[float, int]] = {}
 
 # Настройки мониторинга
 MONITORING_SETTINGS = {
@@ -72,6 +38,10 @@ MONITORING_SETTINGS = {
     'timeout': 20,
 }
 
+# Пустой SHARD_ID — обычный режим: один процесс отслеживает все подарки
+SHARD_ID = (settings.SHARD_ID or "").strip()
+SHARD_DB = settings.SHARD_DB
+
 # Получаем все доступные токены ботов
 def get_all_bot_tokens() -> List[str]:
     """Получает все доступные токены ботов"""
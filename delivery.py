@@ -0,0 +1,293 @@
+import asyncio
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from logging_config import setup_logger
+from metrics import DELIVERY_SECONDS, SEND_SECONDS, SENDS
+
+logger = setup_logger('delivery')
+
+# Лимиты Telegram: ~30 сообщений/с на бота, в личный чат — ~1 в секунду, в группу — ~20 в минуту от бота
+DELIVERY_SETTINGS = {
+    'bot_rate': 25,            # сообщений в секунду на бота
+    'bot_burst': 25,
+    'chat_rate': 1.0,          # сообщений в секунду от одного бота в личный чат
+    'chat_burst': 1,
+    'group_rate': 20 / 60,     # то же для групп и каналов (отрицательный chat_id)
+    'group_burst': 20,
+    'chat_rates': {},          # переопределения по chat_id: {chat_id: (сообщений в секунду, burst)}
+    'max_attempts': 5,         # попыток на сообщение, не считая ожиданий retry_after
+    'failure_cooldown': 30,    # пауза для бота после серии ошибок
+    'failures_to_cooldown': 3,
+    'max_queue': 5000,         # сверх этого submit ждёт, пока очередь разгрузится
+}
+
+# Меньше — раньше: редкие находки обгоняют обычные в очереди чата
+DEFAULT_PRIORITY = 5
+
+DeliveredCallback = Callable[[], Awaitable[None]]
+# Проверка прямо перед отправкой; False — сообщение уже не нужно (например, его отправил другой шард)
+BeforeSendCallback = Callable[[], Awaitable[bool]]
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Сколько секунд ждать до свободного токена"""
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self._refill(time.monotonic())
+        self.tokens -= 1
+
+
+def chat_limits(chat_id, settings: Dict[str, Any]) -> Tuple[float, float]:
+    """Лимит одного бота на чат: переопределение из chat_rates, иначе по типу чата"""
+    override = settings['chat_rates'].get(str(chat_id))
+    if override is not None:
+        return override
+    if str(chat_id).startswith('-'):
+        return settings['group_rate'], settings['group_burst']
+    return settings['chat_rate'], settings['chat_burst']
+
+
+class BotSlot:
+    def __init__(self, bot: Bot, settings: Dict[str, Any]):
+        self.bot = bot
+        self.settings = settings
+        self.bucket = TokenBucket(settings['bot_rate'], settings['bot_burst'])
+        self.chat_buckets: Dict[Any, TokenBucket] = {}
+        self.blocked_until = 0.0
+        self.failures = 0
+        self.sent = 0
+
+    def chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(*chat_limits(chat_id, self.settings))
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    def wait_for(self, chat_id) -> float:
+        blocked = max(0.0, self.blocked_until - time.monotonic())
+        return max(blocked, self.bucket.delay(), self.chat_bucket(chat_id).delay())
+
+
+class Payload:
+    """Текст и параметры сообщения, которые собираются при первой отправке.
+
+    Отброшенная или отложенная находка не тратит время на сборку, а один
+    объект, разосланный в несколько чатов, собирается один раз.
+    """
+
+    def __init__(self, render: Callable[[], Tuple[str, Dict[str, Any]]]):
+        self._render = render
+        self._rendered: Optional[Tuple[str, Dict[str, Any]]] = None
+
+    def get(self) -> Tuple[str, Dict[str, Any]]:
+        if self._rendered is None:
+            self._rendered = self._render()
+        return self._rendered
+
+
+class OutgoingMessage:
+    def __init__(self, chat_id, text: Union[str, Payload], label: str, kwargs: Dict[str, Any],
+                 on_delivered: Optional[DeliveredCallback], before_send: Optional[BeforeSendCallback] = None,
+                 on_dropped: Optional[DeliveredCallback] = None):
+        self.chat_id = chat_id
+        self.text = text
+        self.label = label
+        self.kwargs = kwargs
+        self.on_delivered = on_delivered
+        self.before_send = before_send
+        self.on_dropped = on_dropped
+        self.attempts = 0
+        self.created = time.perf_counter()
+
+
+class DeliveryQueue:
+    """Очередь отправки в Telegram с лимитами по ботам и чатам.
+
+    На каждый чат свой воркер: сообщения уходят по приоритету, при равном —
+    в порядке постановки, а сканер не ждёт отправку. Сообщение уходит через бота, который раньше
+    всех освободится по своим лимитам и не наказан retry_after.
+    """
+
+    def __init__(self, bots: List[Bot], settings: Optional[Dict[str, Any]] = None):
+        self.settings = dict(DELIVERY_SETTINGS, **(settings or {}))
+        self.slots = [BotSlot(bot, self.settings) for bot in bots]
+        self._queues: Dict[Any, asyncio.Queue] = {}
+        self._workers: Dict[Any, asyncio.Task] = {}
+        self._seq = itertools.count()
+        self.delivered = 0
+        self.dropped = 0
+
+    def set_bot_rate(self, rate: float):
+        """Меняет лимит сообщений в секунду на бота без перезапуска"""
+        self.settings['bot_rate'] = rate
+        for slot in self.slots:
+            slot.bucket.rate = rate
+
+    def _queue_for(self, chat_id) -> asyncio.Queue:
+        queue = self._queues.get(chat_id)
+        if queue is None:
+            queue = asyncio.PriorityQueue(maxsize=self.settings['max_queue'])
+            self._queues[chat_id] = queue
+            self._workers[chat_id] = asyncio.create_task(self._chat_worker(chat_id, queue))
+        return queue
+
+    async def submit(self, chat_id, text: Union[str, Payload], label: str = '',
+                     on_delivered: Optional[DeliveredCallback] = None,
+                     priority: int = DEFAULT_PRIORITY, before_send: Optional[BeforeSendCallback] = None,
+                     on_dropped: Optional[DeliveredCallback] = None, **kwargs):
+        """Ставит сообщение в очередь чата; kwargs уходят в bot.send_message, Payload собирается при отправке.
+
+        on_dropped вызывается, если сообщение отброшено окончательно: ошибка сборки,
+        отказ Telegram или исчерпанные попытки.
+        """
+        if not self.slots:
+            logger.error("❌ Нет доступных ботов")
+            return
+        message = OutgoingMessage(chat_id, text, label, kwargs, on_delivered, before_send, on_dropped)
+        await self._queue_for(chat_id).put((priority, next(self._seq), message))
+
+    def _pick_slot(self, chat_id):
+        return min(self.slots, key=lambda slot: (slot.wait_for(chat_id), slot.sent))
+
+    async def _chat_worker(self, chat_id, queue: asyncio.Queue):
+        while True:
+            _, _, message = await queue.get()
+            try:
+                await self._deliver(message)
+            finally:
+                queue.task_done()
+
+    async def _deliver(self, message: OutgoingMessage):
+        while True:
+            slot = self._pick_slot(message.chat_id)
+            wait = slot.wait_for(message.chat_id)
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            if message.before_send is not None:
+                before_send, message.before_send = message.before_send, None
+                if not await before_send():
+                    SENDS.inc('skipped')
+                    logger.debug("🔁 [%s] Сообщение больше не нужно, пропускаем", message.label)
+                    await self._notify_delivered(message)
+                    return
+            try:
+                text, kwargs = self._resolve(message)
+            except Exception as e:
+                SENDS.inc('render_error')
+                self.dropped += 1
+                logger.error(f"❌ [{message.label}] Ошибка сборки сообщения: {e}")
+                await self._notify_dropped(message)
+                return
+            slot.bucket.consume()
+            slot.chat_bucket(message.chat_id).consume()
+            started = time.perf_counter()
+            try:
+                await slot.bot.send_message(message.chat_id, text, **kwargs)
+            except TelegramRetryAfter as e:
+                SENDS.inc('retry_after')
+                slot.blocked_until = time.monotonic() + e.retry_after
+                logger.warning("⏳ [%s] Бот ограничен Telegram на %s с", message.label, e.retry_after)
+                continue
+            except (TelegramBadRequest, TelegramForbiddenError) as e:
+                # Повтор не поможет: сообщение или чат некорректны
+                SENDS.inc('rejected')
+                self.dropped += 1
+                logger.error(f"❌ [{message.label}] Сообщение отклонено: {str(e)[:100]}")
+                await self._notify_dropped(message)
+                return
+            except Exception as e:
+                SENDS.inc('error')
+                message.attempts += 1
+                slot.failures += 1
+                if slot.failures >= self.settings['failures_to_cooldown']:
+                    slot.blocked_until = time.monotonic() + self.settings['failure_cooldown']
+                    slot.failures = 0
+                if message.attempts >= self.settings['max_attempts']:
+                    self.dropped += 1
+                    logger.error(f"❌ [{message.label}] Ошибка отправки, попытки исчерпаны: {str(e)[:100]}")
+                    await self._notify_dropped(message)
+                    return
+                logger.warning("⚠️ [%s] Ошибка отправки, повтор: %.100s", message.label, e)
+                continue
+
+            finished = time.perf_counter()
+            SEND_SECONDS.observe(finished - started)
+            DELIVERY_SECONDS.observe(finished - message.created)
+            SENDS.inc('delivered')
+            slot.failures = 0
+            slot.sent += 1
+            self.delivered += 1
+            await self._notify_delivered(message)
+            return
+
+    @staticmethod
+    async def _notify_delivered(message: OutgoingMessage):
+        if message.on_delivered:
+            try:
+                await message.on_delivered()
+            except Exception as e:
+                logger.error(f"❌ [{message.label}] Ошибка после отправки: {e}")
+
+    @staticmethod
+    async def _notify_dropped(message: OutgoingMessage):
+        if message.on_dropped:
+            try:
+                await message.on_dropped()
+            except Exception as e:
+                logger.error(f"❌ [{message.label}] Ошибка после отказа в отправке: {e}")
+
+    @staticmethod
+    def _resolve(message: OutgoingMessage) -> Tuple[str, Dict[str, Any]]:
+        if isinstance(message.text, Payload):
+            text, extra = message.text.get()
+            return text, dict(extra, **message.kwargs)
+        return message.text, message.kwargs
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(queue.qsize() for queue in self._queues.values())
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            'queue_depth': self.queue_depth,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+            'bots': [
+                {'sent': slot.sent, 'blocked_for': round(max(0.0, slot.blocked_until - time.monotonic()), 1)}
+                for slot in self.slots
+            ],
+        }
+
+    async def close(self, timeout: float = 10.0):
+        """Даёт очередям дослать сообщения и останавливает воркеры"""
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self._queues.values())), timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Не отправлено при остановке: {self.queue_depth}")
+        for worker in self._workers.values():
+            worker.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._workers.clear()
+        self._queues.clear()
@@ -0,0 +1,147 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from logging_config import setup_logger
+from monitoring_config import DIGEST_SETTINGS
+from delivery import BeforeSendCallback, Payload
+
+logger = setup_logger('digest')
+
+# Лимит Telegram на текст сообщения; HTML-теги сюда тоже считаем, с запасом
+DIGEST_MESSAGE_LIMIT = 4096
+DIGEST_TICK = 1.0
+
+DeliveredCallback = Callable[[], Awaitable[None]]
+# (подарок, текст, on_delivered, before_send) -> постановка сводки в очередь отправки
+DigestSender = Callable[[str, Union[str, Payload], Optional[DeliveredCallback], Optional[BeforeSendCallback]],
+                        Awaitable[Any]]
+# (находка, on_delivered, claim); claim проверяется при отправке сводки, а не при добавлении
+DigestItem = Tuple[Dict[str, Any], Optional[DeliveredCallback], Optional[BeforeSendCallback]]
+
+
+class PendingDigest:
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = settings
+        self.items: List[DigestItem] = []
+        self.deadline = time.monotonic() + settings['window']
+
+
+class DigestBuffer:
+    """Копит обычные находки по подарку и отправляет их сводкой.
+
+    Сводка уходит, когда с первой находки прошло window секунд или набралось
+    max_items. Строки собираются из тех же частей, что и format_message,
+    и режутся на сообщения в пределах лимита Telegram.
+    """
+
+    def __init__(self, send: DigestSender, formatter, limit: int = DIGEST_MESSAGE_LIMIT):
+        self.send = send
+        self.formatter = formatter
+        self.limit = limit
+        self.pending: Dict[str, PendingDigest] = {}
+        self.items_sent = 0
+        self.messages_sent = 0
+
+    async def add(self, gift_name: str, result: Dict[str, Any],
+                  on_delivered: Optional[DeliveredCallback] = None,
+                  settings: Optional[Dict[str, Any]] = None,
+                  claim: Optional[BeforeSendCallback] = None):
+        digest = self.pending.get(gift_name)
+        if digest is None:
+            digest = PendingDigest(settings or DIGEST_SETTINGS)
+            self.pending[gift_name] = digest
+        digest.items.append((result, on_delivered, claim))
+        if len(digest.items) >= digest.settings['max_items']:
+            await self.flush(gift_name)
+
+    def render_item(self, result: Dict[str, Any]) -> str:
+        record = result.get('record')
+        parts = [
+            f"<b>{char_type}:</b> {self.formatter.format_characteristic(char_type, char_text, percent)}"
+            for char_type, char_text, percent in record.characteristics
+        ] if record is not None else []
+        owner_info = record.owner if record is not None else None
+        if owner_info and owner_info.get('name'):
+            parts.append(self.formatter.format_owner_display(owner_info))
+        line = f"<a href=\"{result.get('link')}\">#{result.get('num')}</a>"
+        return f"{line} — {', '.join(parts)}" if parts else line
+
+    def render_header(self, gift_name: str, items: List[DigestItem]) -> List[str]:
+        lines = [f"📦 {gift_name}: новых {len(items)}"]
+        last = items[-1][0]
+        record = last.get('record')
+        if record is not None and record.issued_info:
+            lines.append(f"<b>Выпущено:</b> {self.formatter.format_issued(record.issued_info)} issued")
+        lines.extend(self.formatter.format_price_lines(last.get('price_info')))
+        lines.append("")
+        return lines
+
+    def render(self, gift_name: str, items: List[DigestItem]) -> List[Tuple[str, List[DigestItem]]]:
+        """Режет сводку на сообщения не длиннее limit; к каждому — его находки"""
+        header = self.render_header(gift_name, items)
+        # Запас под номер части " (12/34)" в первой строке
+        budget = self.limit - len("\n".join(header)) - 16
+        parts, lines, chunk_items, length = [], [], [], 0
+        for item in items:
+            line = self.render_item(item[0])[:budget]
+            if chunk_items and length + len(line) + 1 > budget:
+                parts.append((lines, chunk_items))
+                lines, chunk_items, length = [], [], 0
+            lines.append(line)
+            chunk_items.append(item)
+            length += len(line) + 1
+        if chunk_items:
+            parts.append((lines, chunk_items))
+
+        chunks = []
+        for index, (lines, chunk_items) in enumerate(parts, 1):
+            title = header[0] if len(parts) == 1 else f"{header[0]} ({index}/{len(parts)})"
+            chunks.append(("\n".join([title] + header[1:] + lines), chunk_items))
+        return chunks
+
+    async def flush(self, gift_name: str):
+        digest = self.pending.pop(gift_name, None)
+        if not digest or not digest.items:
+            return
+        for text, items in self.render(gift_name, digest.items):
+            callbacks = [item[1] for item in items if item[1]]
+
+            async def delivered(callbacks=callbacks):
+                for callback in callbacks:
+                    await callback()
+
+            if not any(item[2] for item in items):
+                await self.send(gift_name, text, delivered, None)
+            else:
+                kept = list(items)
+
+                async def before_send(items=items, kept=kept) -> bool:
+                    # Находки, которые уже отправил кто-то другой, из сводки выпадают
+                    kept[:] = [item for item in items if item[2] is None or await item[2]()]
+                    return bool(kept)
+
+                def render_kept(text=text, items=items, kept=kept):
+                    if len(kept) == len(items):
+                        return text, {}
+                    return self.render(gift_name, kept)[0][0], {}
+
+                await self.send(gift_name, Payload(render_kept), delivered, before_send)
+            self.messages_sent += 1
+            self.items_sent += len(items)
+        logger.info("📦 [%s] Сводка: %d находок", gift_name, len(digest.items))
+
+    async def flush_all(self):
+        for gift_name in list(self.pending):
+            await self.flush(gift_name)
+
+    async def run(self):
+        """Отправляет сводки, у которых истекло окно"""
+        while True:
+            await asyncio.sleep(DIGEST_TICK)
+            now = time.monotonic()
+            for gift_name, digest in list(self.pending.items()):
+                if digest.deadline <= now:
+                    try:
+                        await self.flush(gift_name)
+                    except Exception as e:
+                        logger.error(f"❌ [{gift_name}] Ошибка отправки сводки: {e}")
@@ -0,0 +1,110 @@
+import re
+from typing import Dict, NamedTuple, Optional
+from logging_config import setup_logger
+
+logger = setup_logger('gift_registry')
+
+NFT_URL_PREFIX = "https://t.me/nft/"
+NON_ALNUM_RE = re.compile(r'[^0-9a-z]')
+
+
+def compact_key(value: str) -> str:
+    """'CookieHeart', 'cookie-heart' и 'Cookie Heart' дают один ключ 'cookieheart'"""
+    return NON_ALNUM_RE.sub('', value.lower())
+
+
+def url_slug(url: str) -> str:
+    """Слаг подарка из ссылки вида https://t.me/nft/CookieHeart-"""
+    parts = url.rstrip('-').split('/')
+    return parts[-1] if parts else ""
+
+
+class GiftEntry(NamedTuple):
+    gift_id: Optional[int]
+    name: str
+    url: str
+    price_slug: str
+
+
+class GiftRegistry:
+    """Справочник подарков: слаг t.me, отображаемое имя, слаг telegifter и id.
+
+    Собирается один раз из nft_config, все поиски — по словарям.
+    """
+
+    def __init__(self, nft_links: Dict[int, list], promarket_links: Dict[str, str],
+                 name_mapping: Dict[str, str], slug_aliases: Dict[str, str]):
+        self._price_slugs: Dict[str, str] = dict(name_mapping)
+        self._names: Dict[str, str] = {}
+        # Слаги telegifter слабее названий: добавляем их первыми, названия перезапишут
+        for name, price_slug in name_mapping.items():
+            self._names.setdefault(compact_key(price_slug), name)
+        for name in list(name_mapping) + list(promarket_links):
+            self._names[compact_key(name)] = name
+        for slug, name in slug_aliases.items():
+            self._names[compact_key(slug)] = name
+
+        self._by_url: Dict[str, str] = {}
+        self._by_id: Dict[int, GiftEntry] = {}
+        self._url_by_name: Dict[str, str] = {}
+        for gift_id, (url, _) in nft_links.items():
+            self.add(gift_id, url)
+
+    def add(self, gift_id: int, url: str) -> GiftEntry:
+        """Регистрирует подарок, добавленный во время работы (например, из премаркета)"""
+        name = self.name_for_url(url)
+        entry = GiftEntry(gift_id, name, url, self.price_slug(name))
+        self._by_id[gift_id] = entry
+        self._url_by_name.setdefault(name, url)
+        return entry
+
+    def name_for_url(self, url: str) -> str:
+        name = self._by_url.get(url)
+        if name is None:
+            name = self._resolve_slug(url_slug(url))
+            self._by_url[url] = name
+        return name
+
+    def _resolve_slug(self, slug: str) -> str:
+        name = self._names.get(compact_key(slug))
+        if name:
+            return name
+        # Неизвестный подарок: kebab-case в читаемое имя
+        name = ' '.join(part.capitalize() for part in slug.split('-') if part)
+        return name if name else "Unknown"
+
+    def price_slug(self, name: str) -> str:
+        """Слаг страницы подарка на telegifter"""
+        price_slug = self._price_slugs.get(name)
+        if price_slug is None:
+            price_slug = name.lower().replace(' ', '-')
+            self._price_slugs[name] = price_slug
+        return price_slug
+
+    def gift(self, gift_id: int) -> Optional[GiftEntry]:
+        return self._by_id.get(gift_id)
+
+    def nft_url(self, name: str) -> str:
+        """Ссылка t.me/nft без номера; для неизвестных — из названия"""
+        url = self._url_by_name.get(name)
+        if url is None:
+            url = f"{NFT_URL_PREFIX}{name.lower().replace(' ', '-')}-"
+        return url
+
+
+_registry: Optional[GiftRegistry] = None
+
+
+def get_registry() -> GiftRegistry:
+    global _registry
+    if _registry is None:
+        from nft_config import NFT_LINKS, PROMARKET_LINKS, GIFT_NAME_MAPPING, GIFT_SLUG_ALIASES
+        _registry = GiftRegistry(NFT_LINKS, PROMARKET_LINKS, GIFT_NAME_MAPPING, GIFT_SLUG_ALIASES)
+        logger.debug(f"Справочник подарков: {len(_registry._by_id)} активных, {len(_registry._names)} имён")
+    return _registry
+
+
+def reset_registry():
+    """Сбрасывает справочник после перезагрузки nft_config; соберётся заново при следующем обращении"""
+    global _registry
+    _registry = None
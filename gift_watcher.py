@@ -0,0 +1,80 @@
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+import nft_config
+from gift_registry import reset_registry
+from logging_config import setup_logger
+
+logger = setup_logger('gift_watcher')
+
+GIFTS_CHECK_INTERVAL = 5.0
+
+GiftCallback = Callable[[int, str], Awaitable[None]]
+
+
+def diff_links(old: Dict[int, list], new: Dict[int, list]) -> Tuple[List[int], List[int], List[int]]:
+    """Добавленные, удалённые и изменившие ссылку gift_id"""
+    added = [gift_id for gift_id in new if gift_id not in old]
+    removed = [gift_id for gift_id in old if gift_id not in new]
+    changed = [gift_id for gift_id in new if gift_id in old and new[gift_id][0] != old[gift_id][0]]
+    return added, removed, changed
+
+
+class GiftConfigWatcher:
+    """Следит за gifts.json и перезапускает мониторинг только изменившихся подарков.
+
+    Словари nft_config обновляются на месте, поэтому все, кто их импортировал,
+    видят новые списки; кэши, сессия и прогресс остальных подарков не трогаются.
+    Подарки, добавленные из премаркета во время работы, в файле не появляются
+    и при перезагрузке не останавливаются: сравниваются два состояния файла.
+    """
+
+    def __init__(self, start: GiftCallback, stop: GiftCallback,
+                 path: str = nft_config.GIFTS_FILE, interval: float = GIFTS_CHECK_INTERVAL):
+        self.start = start
+        self.stop = stop
+        self.path = path
+        self.interval = interval
+        self.links = dict(nft_config.NFT_LINKS)
+        self.mtime = os.path.getmtime(path) if os.path.exists(path) else None
+
+    async def apply(self, gifts: Dict[str, Any]):
+        new_links = gifts['nft_links']
+        added, removed, changed = diff_links(self.links, new_links)
+
+        for gift_id in removed:
+            nft_config.NFT_LINKS.pop(gift_id, None)
+        for gift_id in added + changed:
+            nft_config.NFT_LINKS[gift_id] = new_links[gift_id]
+        for name in ('PROMARKET_LINKS', 'GIFT_NAME_MAPPING', 'GIFT_SLUG_ALIASES'):
+            current = getattr(nft_config, name)
+            current.clear()
+            current.update(gifts[name.lower()])
+        reset_registry()
+        old_links = self.links
+        self.links = dict(new_links)
+
+        if added or removed or changed:
+            logger.info(f"🔁 gifts.json: добавлено {len(added)}, удалено {len(removed)}, изменено {len(changed)}")
+        for gift_id in removed + changed:
+            await self.stop(gift_id, old_links[gift_id][0])
+        for gift_id in added + changed:
+            await self.start(gift_id, new_links[gift_id][0])
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                mtime = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+                if mtime is None or mtime == self.mtime:
+                    continue
+                self.mtime = mtime
+                gifts = nft_config.load_gifts(self.path)
+            except Exception as e:
+                # Недописанный или битый файл: работаем со старыми списками до следующей правки
+                logger.error(f"❌ Ошибка чтения {self.path}: {e}")
+                continue
+            try:
+                await self.apply(gifts)
+            except Exception as e:
+                logger.error(f"❌ Ошибка применения {self.path}: {e}")
@@ -0,0 +1,361 @@
+import html
+import re
+from typing import Any, Dict, List, Optional, Tuple
+from bs4 import BeautifulSoup
+from logging_config import setup_logger
+
+logger = setup_logger('html_backends')
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    SelectolaxParser = None
+
+try:
+    import lxml.html as lxml_html
+except ImportError:
+    lxml_html = None
+
+# Порядок выбора при HTML_BACKEND = 'auto': самый быстрый из установленных
+HTML_BACKEND = 'auto'
+PREFERRED_BACKENDS = ('selectolax', 'lxml', 'bs4')
+
+CHAR_TRANSLATION = {
+    'model': 'Модель',
+    'backdrop': 'Фон',
+    'symbol': 'Символ',
+    'модель': 'Модель',
+    'фон': 'Фон',
+    'символ': 'Символ'
+}
+# Характеристики, которые запись хранит ещё и отдельными полями
+RECORD_FIELDS = {'Модель': 'model', 'Фон': 'backdrop', 'Символ': 'symbol'}
+SKIP_CHARACTERISTICS = ('owner', 'quantity')
+ISSUED_KEYWORDS = ('quantity', 'выпущено', 'issued')
+OWNER_SKIP_NAMES = ('Telegram', 'Share', 'Open', 'Forward', 'Preview', 'View in Telegram')
+NON_TEXT_TAGS = ('script', 'style', 'template')
+
+PERCENT_RE = re.compile(r'([\d\.]+)%')
+PERCENT_STRIP_RE = re.compile(r'\s*[\d\.]+%')
+ISSUED_CELL_RE = re.compile(r'([\d\s,]+)\s*[/из]?\s*([\d\s,]+)')
+ISSUED_TEXT_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'(\d[\d\s,]*)\s*/\s*(\d[\d\s,]*)\s*issued',
+    r'issued\s*(\d[\d\s,]*)\s*of\s*(\d[\d\s,]*)',
+    r'(\d[\d\s,]*)\s*из\s*(\d[\d\s,]*)\s*issued',
+    r'(\d[\d\s,]*)\s*из\s*(\d[\d\s,]*)',
+)]
+TME_USER_RE = re.compile(r't\.me/([a-zA-Z0-9_]+)')
+TG_USER_RE = re.compile(r'tg://(?:user|openmessage)\?id=(\d+)')
+OWNER_NAME_RE = re.compile(r'[^\w\s@\-\.]')
+
+
+# ===== Общая обработка текста ячеек, одинаковая для всех бэкендов =====
+
+def characteristic_from_cells(th_text: str, td_text: str) -> Optional[Tuple[str, str, Optional[float]]]:
+    """Строит (тип, значение, процент) из строки таблицы; th_text уже в нижнем регистре"""
+    if th_text in SKIP_CHARACTERISTICS:
+        return None
+    char_text = td_text
+    percent = None
+    percent_match = PERCENT_RE.search(char_text)
+    if percent_match:
+        try:
+            percent = float(percent_match.group(1))
+            char_text = PERCENT_STRIP_RE.sub('', char_text).strip()
+        except ValueError:
+            pass
+    char_type_ru = CHAR_TRANSLATION.get(th_text, th_text.capitalize())
+    if not char_text:
+        return None
+    return (char_type_ru, char_text, percent)
+
+
+def _to_int(value: str) -> int:
+    return int(value.replace(' ', '').replace(',', '').replace('\xa0', ''))
+
+
+def issued_from_cells(th_text: str, td_text: str) -> Optional[Tuple[int, int]]:
+    if not any(keyword in th_text for keyword in ISSUED_KEYWORDS):
+        return None
+    match = ISSUED_CELL_RE.search(td_text.replace(' issued', ''))
+    if not match:
+        return None
+    try:
+        return (_to_int(match.group(1)), _to_int(match.group(2)))
+    except ValueError:
+        return None
+
+
+def issued_from_text(all_text: str) -> Optional[Tuple[int, int]]:
+    for pattern in ISSUED_TEXT_PATTERNS:
+        match = pattern.search(all_text)
+        if match:
+            try:
+                return (_to_int(match.group(1)), _to_int(match.group(2)))
+            except ValueError:
+                continue
+    return None
+
+
+def owner_from_link(href: str, name: str) -> Optional[Dict[str, Any]]:
+    """Разбирает ссылку на владельца; None — ссылка не подходит"""
+    if 't.me/' not in href and 'tg://' not in href:
+        return None
+    if not name or name in OWNER_SKIP_NAMES:
+        return None
+
+    username = None
+    user_id = None
+    if 't.me/' in href:
+        match = TME_USER_RE.search(href)
+        if match:
+            extracted = match.group(1)
+            if extracted.startswith('id') and extracted[2:].isdigit():
+                user_id = extracted[2:]
+            else:
+                username = extracted
+    else:
+        match = TG_USER_RE.search(href)
+        if match:
+            user_id = match.group(1)
+
+    name = OWNER_NAME_RE.sub('', name).strip()
+    if not name:
+        return None
+    return {
+        'name': html.escape(name),
+        'username': username,
+        'user_id': user_id,
+        'href': href
+    }
+
+
+class GiftRecord:
+    """Разобранная страница подарка.
+
+    Заполняется за один проход по таблице: характеристики, счётчик выпуска
+    и владелец из строки Owner; весь документ просматривается, только если
+    чего-то в таблице не нашлось.
+    """
+    __slots__ = ('title', 'characteristics', 'model', 'model_percent', 'backdrop', 'backdrop_percent',
+                 'symbol', 'symbol_percent', 'issued', 'total', 'owner')
+
+    def __init__(self, title: str = ''):
+        self.title = title
+        # (тип, значение, процент) в порядке страницы — для сообщения
+        self.characteristics: List[Tuple[str, str, Optional[float]]] = []
+        self.model: Optional[str] = None
+        self.model_percent: Optional[float] = None
+        self.backdrop: Optional[str] = None
+        self.backdrop_percent: Optional[float] = None
+        self.symbol: Optional[str] = None
+        self.symbol_percent: Optional[float] = None
+        self.issued: Optional[int] = None
+        self.total: Optional[int] = None
+        self.owner: Optional[Dict[str, Any]] = None
+
+    def add_row(self, th_text: str, td_text: str, td_raw: str):
+        """Строка таблицы; th_text в нижнем регистре, td_text без пробелов между узлами"""
+        item = characteristic_from_cells(th_text, td_text)
+        if item:
+            self.characteristics.append(item)
+            field = RECORD_FIELDS.get(item[0])
+            if field == 'model':
+                self.model, self.model_percent = item[1], item[2]
+            elif field == 'backdrop':
+                self.backdrop, self.backdrop_percent = item[1], item[2]
+            elif field == 'symbol':
+                self.symbol, self.symbol_percent = item[1], item[2]
+        if self.issued is None:
+            self.issued_info = issued_from_cells(th_text, td_raw)
+
+    @property
+    def issued_info(self) -> Optional[Tuple[int, int]]:
+        return (self.issued, self.total) if self.issued is not None else None
+
+    @issued_info.setter
+    def issued_info(self, value: Optional[Tuple[int, int]]):
+        if value:
+            self.issued, self.total = value
+
+    @property
+    def is_gift(self) -> bool:
+        return bool(self.title) and "gift" in self.title.lower()
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, GiftRecord):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"GiftRecord({', '.join(f'{slot}={getattr(self, slot)!r}' for slot in self.__slots__)})"
+
+
+# ===== BeautifulSoup (html.parser) — эталонный и запасной вариант =====
+
+def soup_record(soup) -> GiftRecord:
+    record = GiftRecord((soup.title.string or '') if soup.title else '')
+    try:
+        table = soup.find('table', class_='tgme_gift_table')
+        for row in (table.find_all('tr') if table else ()):
+            th = row.find('th')
+            td = row.find('td')
+            if not (th and td):
+                continue
+            th_text = th.text.strip().lower()
+            if th_text == 'owner' and record.owner is None:
+                for a_tag in td.find_all('a', href=True):
+                    record.owner = owner_from_link(a_tag.get('href', ''), a_tag.get_text(strip=True))
+                    if record.owner:
+                        break
+            record.add_row(th_text, td.get_text(strip=True), td.text.strip())
+    except Exception:
+        record.characteristics = []
+
+    if record.issued is None:
+        try:
+            record.issued_info = issued_from_text(soup.get_text())
+        except Exception:
+            pass
+    if record.owner is None:
+        try:
+            for a_tag in soup.find_all('a', href=True):
+                record.owner = owner_from_link(a_tag.get('href', ''), a_tag.get_text(strip=True))
+                if record.owner:
+                    break
+        except Exception:
+            pass
+    return record
+
+
+class SoupBackend:
+    name = 'bs4'
+
+    def parse(self, text: str) -> GiftRecord:
+        return soup_record(BeautifulSoup(text, 'html.parser'))
+
+
+# ===== lxml =====
+
+class LxmlBackend:
+    name = 'lxml'
+
+    def parse(self, text: str) -> GiftRecord:
+        try:
+            doc = lxml_html.document_fromstring(text)
+        except Exception:
+            return GiftRecord()
+        record = GiftRecord(doc.findtext('.//title') or '')
+
+        try:
+            tables = doc.xpath('//table[contains(concat(" ", normalize-space(@class), " "), " tgme_gift_table ")]')
+            for row in (tables[0].iter('tr') if tables else ()):
+                th = row.find('.//th')
+                td = row.find('.//td')
+                if th is None or td is None:
+                    continue
+                th_text = ''.join(th.itertext()).strip().lower()
+                if th_text == 'owner' and record.owner is None:
+                    record.owner = self._owner(td.iter('a'))
+                record.add_row(th_text, ''.join(s.strip() for s in td.itertext()), ''.join(td.itertext()).strip())
+        except Exception:
+            record.characteristics = []
+
+        if record.issued is None:
+            try:
+                texts = doc.xpath('//text()[not(ancestor::script) and not(ancestor::style) and not(ancestor::template)]')
+                record.issued_info = issued_from_text(''.join(texts))
+            except Exception:
+                pass
+
+        if record.owner is None:
+            try:
+                record.owner = self._owner(doc.iter('a'))
+            except Exception:
+                pass
+        return record
+
+    @staticmethod
+    def _owner(links) -> Optional[Dict[str, Any]]:
+        for a_tag in links:
+            href = a_tag.get('href')
+            if href is None:
+                continue
+            owner = owner_from_link(href, ''.join(s.strip() for s in a_tag.itertext()))
+            if owner:
+                return owner
+        return None
+
+
+# ===== selectolax (движок lexbor) =====
+
+class SelectolaxBackend:
+    name = 'selectolax'
+
+    def parse(self, text: str) -> GiftRecord:
+        try:
+            tree = SelectolaxParser(text)
+        except Exception:
+            return GiftRecord()
+        title = tree.css_first('title')
+        record = GiftRecord(title.text() if title else '')
+
+        try:
+            table = tree.css_first('table.tgme_gift_table')
+            for row in (table.css('tr') if table else ()):
+                th = row.css_first('th')
+                td = row.css_first('td')
+                if th is None or td is None:
+                    continue
+                th_text = th.text().strip().lower()
+                if th_text == 'owner' and record.owner is None:
+                    record.owner = self._owner(td.css('a[href]'))
+                record.add_row(th_text, td.text(separator='', strip=True), td.text().strip())
+        except Exception:
+            record.characteristics = []
+
+        if record.owner is None:
+            try:
+                record.owner = self._owner(tree.css('a[href]'))
+            except Exception:
+                pass
+
+        if record.issued is None:
+            try:
+                # Дерево больше не нужно, поэтому можно вырезать скрипты прямо в нём
+                tree.strip_tags(list(NON_TEXT_TAGS))
+                record.issued_info = issued_from_text(tree.root.text() if tree.root else '')
+            except Exception:
+                pass
+        return record
+
+    @staticmethod
+    def _owner(links) -> Optional[Dict[str, Any]]:
+        for a_tag in links:
+            owner = owner_from_link(a_tag.attributes.get('href') or '', a_tag.text(separator='', strip=True))
+            if owner:
+                return owner
+        return None
+
+
+BACKENDS = {
+    'bs4': (SoupBackend, True),
+    'lxml': (LxmlBackend, lxml_html is not None),
+    'selectolax': (SelectolaxBackend, SelectolaxParser is not None),
+}
+
+
+def available_backends() -> List[str]:
+    return [name for name in PREFERRED_BACKENDS if BACKENDS[name][1]]
+
+
+def get_backend(name: Optional[str] = None):
+    """Возвращает парсер страниц по имени; недоступный откатывается к BeautifulSoup"""
+    name = name or HTML_BACKEND
+    if name == 'auto':
+        name = available_backends()[0]
+    backend_cls, available = BACKENDS.get(name, (SoupBackend, True))
+    if not available:
+        logger.warning(f"HTML бэкенд {name} не установлен, используем bs4")
+        backend_cls = SoupBackend
+    return backend_cls()
@@ -0,0 +1,54 @@
+import aiohttp
+from typing import Optional
+from logging_config import setup_logger
+
+logger = setup_logger('http_client')
+
+# Один пул соединений на процесс для t.me и telegifter.ru.
+# aiohttp работает только по HTTP/1.1, поэтому выигрыш берём за счёт
+# переиспользования keep-alive соединений и кэша DNS.
+HTTP_SETTINGS = {
+    'limit': 100,              # всего соединений в пуле
+    'limit_per_host': 50,      # соединений на один хост
+    'ttl_dns_cache': 600,      # секунды жизни записи в кэше DNS
+    'keepalive_timeout': 60,   # сколько держать простаивающее соединение
+    'total_timeout': 15,
+}
+
+DEFAULT_HEADERS = {
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+    'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+_session: Optional[aiohttp.ClientSession] = None
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Возвращает общую для процесса сессию, создавая её при первом обращении"""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=HTTP_SETTINGS['limit'],
+            limit_per_host=HTTP_SETTINGS['limit_per_host'],
+            use_dns_cache=True,
+            ttl_dns_cache=HTTP_SETTINGS['ttl_dns_cache'],
+            keepalive_timeout=HTTP_SETTINGS['keepalive_timeout'],
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=HTTP_SETTINGS['total_timeout']),
+            headers=DEFAULT_HEADERS,
+        )
+        logger.debug(f"Создан общий HTTP пул: {HTTP_SETTINGS}")
+    return _session
+
+
+async def close_session():
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
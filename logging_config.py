@@ -1,49 +1,191 @@
+import atexit
+import json
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 import os
+from typing import Dict, Optional
+
+# Запись в файлы и консоль идёт в отдельном потоке, цикл только кладёт запись в очередь
+LOG_SETTINGS = {
+    'dir': 'logs',
+    'json_files': True,        # app.log и errors.log — по JSON-объекту на строку
+    'app_max_bytes': 1024*1024*10,  # 10 MB
+    'app_backups': 5,
+    'errors_max_bytes': 1024*1024*5,  # 5 MB
+    'errors_backups': 3,
+}
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Стандартные атрибуты LogRecord; всё остальное пришло через extra= и попадает в JSON
+RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — один JSON-объект; поля из extra= кладутся рядом с сообщением"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'ts': round(record.created, 3),
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRS:
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exc'] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class LoopQueueHandler(QueueHandler):
+    """Кладёт запись в очередь почти как есть: время, JSON и диск — в потоке записи"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Аргументы подставляем сразу: изменяемые объекты могут поменяться до записи
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_queue_handler: Optional[QueueHandler] = None
+_listener: Optional[QueueListener] = None
+_listener_started = False
+# В процессе-воркере пула вместо очереди: её копию там никто не читает
+_worker_handler: Optional[logging.Handler] = None
+
+
+def _get_queue_handler() -> QueueHandler:
+    """Один набор обработчиков на процесс за одной очередью; поток записи стартует в start_logging()"""
+    global _queue_handler, _listener
+    if _queue_handler is not None:
+        return _queue_handler
 
-def setup_logger(name):
-    logger = logging.getLogger(name)
-    
-    # Проверяем, есть ли уже обработчики у логгера
-    if logger.handlers:
-        return logger
-    
-    logger.setLevel(logging.DEBUG)
-    
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    
     # Создаем директорию для логов, если ее нет
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
-    
+    if not os.path.exists(LOG_SETTINGS['dir']):
+        os.makedirs(LOG_SETTINGS['dir'])
+
+    text_formatter = logging.Formatter(TEXT_FORMAT)
+    file_formatter = JsonFormatter() if LOG_SETTINGS['json_files'] else text_formatter
+
     file_handler = RotatingFileHandler(
-        'logs/app.log',
-        maxBytes=1024*1024*10,  # 10 MB
-        backupCount=5,
+        os.path.join(LOG_SETTINGS['dir'], 'app.log'),
+        maxBytes=LOG_SETTINGS['app_max_bytes'],
+        backupCount=LOG_SETTINGS['app_backups'],
         encoding='utf-8'
     )
     file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(formatter)
-    
+    file_handler.setFormatter(file_formatter)
+
     # Отдельный файл для ошибок
     error_handler = RotatingFileHandler(
-        'logs/errors.log',
-        maxBytes=1024*1024*5,  # 5 MB
-        backupCount=3,
+        os.path.join(LOG_SETTINGS['dir'], 'errors.log'),
+        maxBytes=LOG_SETTINGS['errors_max_bytes'],
+        backupCount=LOG_SETTINGS['errors_backups'],
         encoding='utf-8'
     )
     error_handler.setLevel(logging.ERROR)
-    error_handler.setFormatter(formatter)
-    
+    error_handler.setFormatter(file_formatter)
+
     console_handler = logging.StreamHandler()
     console_handler.setLevel(logging.INFO)
-    console_handler.setFormatter(formatter)
-    
-    logger.addHandler(file_handler)
-    logger.addHandler(error_handler)
-    logger.addHandler(console_handler)
-    
-    return logger
\ No newline at end of file
+    console_handler.setFormatter(text_formatter)
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler = LoopQueueHandler(log_queue)
+    _listener = QueueListener(log_queue, file_handler, error_handler, console_handler,
+                              respect_handler_level=True)
+    atexit.register(stop_logging)
+    return _queue_handler
+
+
+def start_logging():
+    """Запускает поток записи; записи, сделанные до этого, ждут в очереди.
+
+    Вызывается после того, как ParsePool форкнул воркеры: форк процесса
+    с уже работающим потоком небезопасен.
+    """
+    global _listener_started
+    _get_queue_handler()
+    if _listener is not None and not _listener_started:
+        _listener.start()
+        _listener_started = True
+
+
+def stop_logging():
+    """Дописывает очередь и останавливает поток записи"""
+    global _listener, _listener_started
+    if _listener is None:
+        return
+    if not _listener_started:
+        # Поток так и не запустили (скрипт без start_logging): выводим накопленное
+        _listener.start()
+    _listener.stop()
+    _listener = None
+    _listener_started = False
+
+
+def use_worker_logging(level: int = logging.WARNING):
+    """Для процесса-воркера после fork: логгеры пишут прямо в stderr, а не в очередь родителя"""
+    global _worker_handler, _queue_handler, _listener, _listener_started
+    _worker_handler = logging.StreamHandler()
+    _worker_handler.setLevel(level)
+    _worker_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    for logger in list(logging.root.manager.loggerDict.values()):
+        if isinstance(logger, logging.Logger) and _queue_handler in logger.handlers:
+            logger.removeHandler(_queue_handler)
+            logger.addHandler(_worker_handler)
+    # Поток записи и файлы принадлежат родителю
+    _queue_handler = None
+    _listener = None
+    _listener_started = False
+
+
+def setup_logger(name):
+    logger = logging.getLogger(name)
+
+    # Проверяем, есть ли уже обработчики у логгера
+    if logger.handlers:
+        return logger
+
+    logger.setLevel(logging.DEBUG)
+    logger.addHandler(_worker_handler or _get_queue_handler())
+
+    return logger
+
+
+class LogThrottle:
+    """Не чаще одной записи на ключ за interval секунд; пропущенные считаются.
+
+    Для повторяющихся сообщений вроде ошибок отдельных проверок: первая
+    запись уходит сразу, следующая — не раньше чем через interval, с числом
+    пропущенных за это время.
+    """
+
+    def __init__(self, interval: float = 60.0):
+        self.interval = interval
+        self._last: Dict[str, float] = {}
+        self._suppressed: Dict[str, int] = {}
+
+    def log(self, logger: logging.Logger, level: int, key: str, msg: str, *args):
+        if not logger.isEnabledFor(level):
+            return
+        now = time.monotonic()
+        last = self._last.get(key)
+        if last is not None and now - last < self.interval:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return
+        self._last[key] = now
+        suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            msg += ' (ещё %d похожих за %g с)'
+            args += (suppressed, self.interval)
+        logger.log(level, msg, *args, extra={'throttle_key': key, 'suppressed': suppressed})
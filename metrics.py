@@ -0,0 +1,191 @@
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from aiohttp import web
+from logging_config import setup_logger
+
+logger = setup_logger('metrics')
+
+# Локальная страница /metrics в текстовом формате Prometheus
+METRICS_SETTINGS = {
+    'enabled': True,
+    'host': '127.0.0.1',
+    'port': 9108,
+}
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(names: Sequence[str], values: Labels, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        REGISTRY.append(self)
+
+    def header(self) -> List[str]:
+        return [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Счётчик: на горячем пути только прибавление в словаре"""
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        return [f'{self.name}{_label_text(self.labels, labels)} {value}' for labels, value in self.values.items()]
+
+
+class Histogram(Metric):
+    """Гистограмма; накопительные суммы по корзинам считаются только при выдаче"""
+    kind = 'histogram'
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[Labels, list] = {}
+
+    def observe(self, value: float, *labels):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def time(self, *labels) -> 'Timer':
+        return Timer(self, labels)
+
+    def render(self) -> List[str]:
+        lines = []
+        for labels, (counts, total) in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="+Inf"' if bound == float('inf') else f'le="{bound}"'
+                lines.append(f'{self.name}_bucket{_label_text(self.labels, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_label_text(self.labels, labels)} {total}')
+            lines.append(f'{self.name}_count{_label_text(self.labels, labels)} {cumulative}')
+        return lines
+
+
+class Timer:
+    def __init__(self, histogram: Histogram, labels: Labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class CallbackMetric(Metric):
+    """Значения, которые читаются из живых объектов только в момент выдачи"""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), kind: str = 'gauge'):
+        super().__init__(name, help_text, labels)
+        self.kind = kind
+        self.callback: Optional[Callable[[], Dict[Labels, float]]] = None
+
+    def set_callback(self, callback: Callable[[], Dict[Labels, float]]):
+        self.callback = callback
+
+    def render(self) -> List[str]:
+        if self.callback is None:
+            return []
+        try:
+            values = self.callback()
+        except Exception as e:
+            logger.error(f"❌ Ошибка сбора метрики {self.name}: {e}")
+            return []
+        return [f'{self.name}{_label_text(self.labels, labels)} {value}' for labels, value in values.items()]
+
+
+REGISTRY: List[Metric] = []
+
+# Сканирование
+# Счётчики по подаркам уже ведёт CrawlScheduler, здесь они только читаются
+PROBES = CallbackMetric('nft_probes_total', 'Проверенные номера по gift_id', ('gift',), 'counter')
+PROBE_HITS = CallbackMetric('nft_probe_hits_total', 'Найденные подарки по gift_id', ('gift',), 'counter')
+PROBE_RATE = CallbackMetric('nft_probes_per_second', 'Скорость запросов по gift_id, включая служебные', ('gift',))
+SCHEDULER_REQUESTS = CallbackMetric('nft_scheduler_requests_total', 'Запросы через планировщик по видам',
+                                    ('kind',), 'counter')
+PROBE_SECONDS = Histogram('nft_probe_seconds', 'Одна попытка проверки номера')
+PROBE_RETRIES = Counter('nft_probe_retries_total', 'Повторы проверки после ошибки')
+SCHEDULER_WAIT_SECONDS = Histogram('nft_scheduler_wait_seconds', 'Ожидание свободного воркера в очереди проверок')
+QUEUE_DEPTH = CallbackMetric('nft_queue_depth', 'Глубина очередей', ('queue',))
+
+# Загрузка и разбор страниц
+FETCH_STATUS = Counter('nft_fetch_status_total', 'Ответы t.me по HTTP-статусу', ('status',))
+# Один исход на каждый вызов fetch: gift, not_gift, bad_status или имя исключения
+FETCH_OUTCOMES = Counter('nft_fetch_outcomes_total', 'Исходы Parcer.fetch', ('outcome',))
+FETCH_SECONDS = Histogram('nft_fetch_seconds', 'Parcer.fetch целиком')
+PARSE_SECONDS = Histogram('nft_parse_seconds', 'Разбор страницы подарка', ('backend',))
+
+# Цены
+PRICE_FETCH_SECONDS = Histogram('nft_price_fetch_seconds', 'Загрузка цены с telegifter')
+PRICE_LOOKUPS = CallbackMetric('nft_price_lookups_total', 'Обращения к кэшу цен', ('result',), 'counter')
+
+# Отправка
+ALERTS = Counter('nft_alerts_total', 'Решения правил по находкам', ('action',))
+SENDS = Counter('nft_telegram_sends_total', 'Результаты отправки в Telegram', ('result',))
+SEND_SECONDS = Histogram('nft_telegram_send_seconds', 'Вызов send_message')
+DELIVERY_SECONDS = Histogram('nft_telegram_delivery_seconds', 'От постановки в очередь до доставки')
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        body = metric.render()
+        if body:
+            lines.extend(metric.header())
+            lines.extend(body)
+    return '\n'.join(lines) + '\n'
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    return web.Response(text=render(), content_type='text/plain', charset='utf-8')
+
+
+async def start_metrics_server(host: str = METRICS_SETTINGS['host'],
+                               port: int = METRICS_SETTINGS['port']) -> Optional[web.AppRunner]:
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError as e:
+        logger.error(f"❌ Не удалось открыть метрики на {host}:{port}: {e}")
+        await runner.cleanup()
+        return None
+    logger.info(f"📈 Метрики: http://{host}:{port}/metrics")
+    return runner
@@ -1,11 +1,15 @@
 # Настройки мониторинга
 MONITORING_CONFIG = {
     'default': {
-        'check_interval': 1,  # секунды между проверками
+        'check_interval': 1,  # секунды между чтениями счётчика; только для scan_mode 'frontier',
+                              # паузы режима 'window' задают idle_interval/idle_max в SCAN_SETTINGS
         'batch_size': 10,     # размер батча для проверки пропущенных
         'max_skips': 100,     # максимальное количество пропусков перед переходом
         'retry_delay': 1,     # задержка при ошибке
         'concurrent_requests': 20,  # максимальное количество одновременных запросов
+        'max_retries': 3,     # попыток на номер при сетевой ошибке
+        'send_rate': 25,      # сообщений в секунду на бота
+        'rate_limited': False,  # ограничивать запросы по подарку (см. config.MONITORING_SETTINGS)
     },
     'aggressive': {
         'check_interval': 0.5,
@@ -13,6 +17,9 @@ MONITORING_CONFIG = {
         'max_skips': 50,
         'retry_delay': 0.5,
         'concurrent_requests': 30,
+        'max_retries': 3,
+        'send_rate': 28,
+        'rate_limited': False,
     },
     'conservative': {
         'check_interval': 2,
@@ -20,8 +27,81 @@ MONITORING_CONFIG = {
         'max_skips': 200,
         'retry_delay': 2,
         'concurrent_requests': 10,
+        'max_retries': 2,
+        'send_rate': 5,
+        'rate_limited': True,
     }
 }
 
 # Текущий режим
-CURRENT_MODE = 'aggressive'
\ No newline at end of file
+CURRENT_MODE = 'aggressive'
+
+# Режимы отдельных подарков по gift_id; остальные идут в CURRENT_MODE.
+# Во время работы режим меняется сигналом или файлом управления, см. profiles.py
+GIFT_PROFILES = {}
+
+
+def profile_scan_settings(profile: dict) -> dict:
+    """Переводит режим мониторинга в настройки сканирования подарка"""
+    return {
+        'max_skips': profile['max_skips'],
+        'retry_delay': profile['retry_delay'],
+        'max_retries': profile['max_retries'],
+        'frontier_interval': profile['check_interval'],
+        'probe_rate': profile.get('probe_rate'),
+    }
+
+
+# Сканирование номеров скользящим окном
+SCAN_SETTINGS = {
+    'scan_mode': 'window',    # 'window' — окно запросов, 'sequential' — по одному номеру,
+                              # 'frontier' — по счётчику выпущенных на странице подарка
+    'window_initial': 4,      # сколько номеров проверяем одновременно на старте
+    'window_min': 1,          # окно в простое, когда новых минтов нет
+    'window_max': 32,         # предел окна во время волны минтов; batch_size режима ограничивает его сверху
+    'head_retries': 2,        # перепроверок пустого номера перед пропуском, если дальше есть минты
+    'idle_interval': 0.01,    # пауза после пустого окна у активного подарка
+    'idle_max': 30.0,         # предел паузы для подарка без минтов
+    'idle_backoff': 2.0,      # во сколько раз растёт пауза после каждого пустого прохода
+    'cadence_alpha': 0.3,     # вес нового интервала в EWMA интервалов между минтами
+    'frontier_interval': 1.0, # чаще этого счётчик выпущенных в режиме 'frontier' не читаем
+    'frontier_gap_passes': 10, # столько проходов повторяем номер, который счётчик уже показал, а страница ещё нет
+    'commit_every': 1,        # сохранять last_found.json после каждых N отправленных
+}
+
+# Переопределения по gift_id из NFT_LINKS
+GIFT_SCAN_SETTINGS = {
+    61: {'window_initial': 8, 'window_max': 64},  # CookieHeart
+}
+
+
+def get_scan_settings(gift_id: int, profile: dict = None) -> dict:
+    """Возвращает настройки сканирования для подарка с учётом режима и переопределений"""
+    profile = profile or MONITORING_CONFIG[CURRENT_MODE]
+    settings = dict(SCAN_SETTINGS)
+    settings.update(profile_scan_settings(profile))
+    settings.update(GIFT_SCAN_SETTINGS.get(gift_id, {}))
+    # Предел окна подарка не может превышать batch_size режима: осторожный режим сужает и CookieHeart
+    settings['window_max'] = min(settings['window_max'], profile['batch_size'])
+    return settings
+
+
+
+# Сводки: обычные находки копятся и уходят одним сообщением, редкие — отдельно
+DIGEST_SETTINGS = {
+    'enabled': False,         # включается для подарков с волнами минтов
+    'window': 30,             # секунд от первой находки до отправки сводки
+    'max_items': 25,          # или раньше, когда набралось столько находок
+}
+
+# Переопределения по gift_id из NFT_LINKS
+GIFT_DIGEST_SETTINGS = {
+    61: {'enabled': True},  # CookieHeart
+}
+
+
+def get_digest_settings(gift_id: int) -> dict:
+    """Возвращает настройки сводок для подарка с учётом переопределений"""
+    settings = dict(DIGEST_SETTINGS)
+    settings.update(GIFT_DIGEST_SETTINGS.get(gift_id, {}))
+    return settings
\ No newline at end of file
@@ -4,6 +4,13 @@ import re
 from bs4 import BeautifulSoup
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from logging_config import setup_logger
+from http_client import get_session
+from cache_store import get_store
+from gift_registry import get_registry
+from html_backends import GiftRecord, get_backend, soup_record
+from delivery import Payload
+from metrics import FETCH_OUTCOMES, FETCH_SECONDS, FETCH_STATUS, PARSE_SECONDS, PRICE_FETCH_SECONDS
+from parse_pool import ParsePool
 from urllib.parse import urljoin
 import html
 import random
@@ -26,395 +33,397 @@ USER_AGENTS = [
 
 price_cache = {}
 CACHE_DURATION = 300
+# Фоновое обновление цен идёт чаще, чем истекает кэш, чтобы fetch всегда находил цену
+PRICE_REFRESH_INTERVAL = CACHE_DURATION // 2
+PRICE_REFRESH_CONCURRENCY = 4
+# Дольше этого устаревшая цена не показывается, а загружается заново
+PRICE_MAX_STALE = 24 * 3600
 last_nft_number_cache = {}
+FRONTIER_CACHE_DURATION = 300
+issued_count_cache = {}
+ISSUED_CACHE_DURATION = 60
+
+# Пространства имён постоянного кэша для словарей выше
+PERSISTENT_CACHES = {
+    'price': price_cache,
+    'frontier': last_nft_number_cache,
+    'issued': issued_count_cache,
+}
+
+
+def remember(namespace: str, key: str, value, timestamp: float):
+    """Кладёт значение в кэш процесса и, если он открыт, в постоянный кэш"""
+    PERSISTENT_CACHES[namespace][key] = (value, timestamp)
+    store = get_store()
+    if store:
+        store.set(namespace, key, value, timestamp)
+
+
+def restore_persistent_caches() -> int:
+    """Поднимает сохранённые записи в кэши процесса; свежесть проверяется при чтении"""
+    store = get_store()
+    if not store:
+        return 0
+    restored = 0
+    for namespace, cache in PERSISTENT_CACHES.items():
+        entries = store.load(namespace)
+        cache.update(entries)
+        restored += len(entries)
+    return restored
+
+# Поиск последнего выпущенного номера
+FRONTIER_PROBES_PER_ROUND = 8
+FRONTIER_MAX_NUMBER = 1000000
+
+# Быстрая проверка страницы по сырому <title> до разбора DOM.
+# <title> у t.me стоит в самом начале <head>, дальше искать не нужно.
+TITLE_SCAN_BYTES = 4096
+TITLE_RE = re.compile(rb'<title[^>]{0,64}>([^<]{0,512})</title>', re.I)
+
+
+def sniff_gift_page(content: bytes) -> Optional[bool]:
+    """Решает по <title>, страница ли это подарка; None — заголовок не найден"""
+    match = TITLE_RE.search(content, 0, TITLE_SCAN_BYTES)
+    if not match:
+        return None
+    return b'gift' in match.group(1).lower()
+
+
+def decode_page(response: aiohttp.ClientResponse, content: bytes) -> str:
+    return content.decode(response.charset or 'utf-8', errors='replace')
+
+def extract_price_data(content: str) -> Dict[str, Optional[float]]:
+    """Цены TON/USDT/RUB со страницы telegifter; выполняется и в пуле разбора"""
+    soup = BeautifulSoup(content, 'html.parser')
+    
+    # Ищем цены на странице
+    price_data = {'ton': None, 'usdt': None, 'rub': None}
+    
+    # Ищем все div с ценами
+    price_divs = soup.find_all('div', class_=re.compile(r'price', re.I))
+    
+    for div in price_divs:
+        text = div.get_text(strip=True)
+        
+        # Ищем TON
+        ton_match = re.search(r'([\d\.,]+)\s*TON', text, re.I)
+        if ton_match:
+            try:
+                ton_price = ton_match.group(1).replace(',', '')
+                price_data['ton'] = float(ton_price)
+            except:
+                pass
+        
+        # Ищем USDT
+        usdt_match = re.search(r'([\d\.,]+)\s*USDT', text, re.I)
+        if usdt_match:
+            try:
+                usdt_price = usdt_match.group(1).replace(',', '')
+                price_data['usdt'] = float(usdt_price)
+            except:
+                pass
+        
+        # Ищем RUB
+        rub_match = re.search(r'([\d\.,]+)\s*RUB', text, re.I)
+        if rub_match:
+            try:
+                rub_price = rub_match.group(1).replace(',', '')
+                price_data['rub'] = float(rub_price)
+            except:
+                pass
+    
+    # Если не нашли в div, ищем во всем тексте
+    if not any(price_data.values()):
+        all_text = soup.get_text()
+        
+        ton_matches = re.findall(r'([\d\.,]+)\s*TON', all_text, re.I)
+        if ton_matches:
+            try:
+                price_data['ton'] = float(ton_matches[-1].replace(',', ''))
+            except:
+                pass
+        
+        usdt_matches = re.findall(r'([\d\.,]+)\s*USDT', all_text, re.I)
+        if usdt_matches:
+            try:
+                price_data['usdt'] = float(usdt_matches[-1].replace(',', ''))
+            except:
+                pass
+        
+        rub_matches = re.findall(r'([\d\.,]+)\s*RUB', all_text, re.I)
+        if rub_matches:
+            try:
+                price_data['rub'] = float(rub_matches[-1].replace(',', ''))
+            except:
+                pass
+    return price_data
+
 
 class PriceParser:
-    def __init__(self):
-        self.session = None
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None, parse_pool: Optional[ParsePool] = None):
+        self.session = session
+        self.parse_pool = parse_pool
+        # Общий планировщик запросов; без него цены грузятся напрямую
+        self.scheduler = None
+        self.user_agent = random.choice(USER_AGENTS)
         self.base_url = "https://telegifter.ru/gifts/"
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.stats = {'hits': 0, 'stale': 0, 'misses': 0, 'refreshes': 0, 'coalesced': 0, 'errors': 0}
         
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=15),
-            headers={
-                'User-Agent': random.choice(USER_AGENTS),
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-                'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'DNT': '1',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-            }
-        )
+        if self.session is None:
+            self.session = get_session()
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
-        if self.session:
-            await self.session.close()
+        # Сессия общая для процесса, закрывается через http_client.close_session()
+        pass
     
     def normalize_gift_name(self, gift_name):
         """Нормализует имя подарка для поиска на telegifter"""
-        try:
-            from nft_config import GIFT_NAME_MAPPING
-            if gift_name in GIFT_NAME_MAPPING:
-                return GIFT_NAME_MAPPING[gift_name]
-            
-            # Общая нормализация
-            name_lower = gift_name.lower().replace(' ', '-')
-            return name_lower
-        except:
-            return gift_name.lower().replace(' ', '-')
+        return get_registry().price_slug(gift_name)
     
-    async def get_gift_price_info(self, gift_name, characteristics=None):
-        """Получает информацию о ценах подарка с telegifter"""
+    def peek_gift_price_info(self, gift_name) -> Optional[Dict]:
+        """Цена из кэша без запроса; устаревшая цена лучше, чем никакой"""
+        cached = price_cache.get(gift_name.lower())
+        if not cached:
+            self.stats['misses'] += 1
+            return None
+        cached_data, timestamp = cached
+        self.stats['hits' if time.time() - timestamp < CACHE_DURATION else 'stale'] += 1
+        return cached_data
+
+    def warm(self, gift_name):
+        """Запускает загрузку цены в фоне, если она ещё не идёт"""
+        self._load_once(gift_name)
+
+    def _load_once(self, gift_name) -> asyncio.Task:
+        """Один запрос на подарок: параллельные промахи ждут уже идущую загрузку"""
         cache_key = gift_name.lower()
-        current_time = time.time()
-        
-        if cache_key in price_cache:
-            cached_data, timestamp = price_cache[cache_key]
-            if current_time - timestamp < CACHE_DURATION:
+        task = self._inflight.get(cache_key)
+        if task is not None:
+            self.stats['coalesced'] += 1
+            return task
+        if self.scheduler is not None:
+            task = asyncio.create_task(self.scheduler.call('price', self._load_price, gift_name))
+        else:
+            task = asyncio.create_task(self._load_price(gift_name))
+        self._inflight[cache_key] = task
+
+        def done(_):
+            self._inflight.pop(cache_key, None)
+
+        task.add_done_callback(done)
+        return task
+
+    async def refresh_loop(self, get_gift_names, interval: float = PRICE_REFRESH_INTERVAL,
+                           concurrency: int = PRICE_REFRESH_CONCURRENCY):
+        """Держит price_cache тёплым для всех отслеживаемых подарков"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def refresh(gift_name):
+            async with semaphore:
+                return await self.get_gift_price_info(gift_name, force=True)
+
+        while True:
+            gift_names = get_gift_names()
+            results = await asyncio.gather(*(refresh(gift_name) for gift_name in gift_names))
+            refreshed = sum(1 for price_data in results if price_data)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Цены обновлены: %d/%d, %s", refreshed, len(gift_names), self.snapshot())
+            await asyncio.sleep(interval)
+
+    def snapshot(self) -> Dict:
+        """Счётчики кэша цен и возраст самой старой цены в секундах"""
+        now = time.time()
+        oldest = max((now - timestamp for _, timestamp in price_cache.values()), default=0)
+        return dict(self.stats, cached=len(price_cache), inflight=len(self._inflight), oldest_age=round(oldest))
+
+    async def get_gift_price_info(self, gift_name, characteristics=None, force=False):
+        """Цена подарка: свежая из кэша, устаревшая с фоновым обновлением, иначе запрос"""
+        cached = price_cache.get(gift_name.lower())
+        if cached and not force:
+            cached_data, timestamp = cached
+            age = time.time() - timestamp
+            if age < CACHE_DURATION:
+                self.stats['hits'] += 1
+                return cached_data
+            if age < PRICE_MAX_STALE:
+                self.stats['stale'] += 1
+                self.warm(gift_name)
                 return cached_data
+        self.stats['refreshes' if force else 'misses'] += 1
+        # shield: отмена одного ждущего не должна обрывать общую загрузку
+        return await asyncio.shield(self._load_once(gift_name))
+
+    async def _load_price(self, gift_name):
+        """Загружает цену с telegifter и кладёт её в кэш"""
+        cache_key = gift_name.lower()
+        current_time = time.time()
+        # Без ожидания в очереди планировщика: его показывает nft_scheduler_wait_seconds
+        started = time.perf_counter()
         
         try:
             normalized_name = self.normalize_gift_name(gift_name)
             url = f"{self.base_url}{normalized_name}/"
             
-            logger.debug(f"Запрос цены для {gift_name}: {url}")
+            logger.debug("Запрос цены для %s: %s", gift_name, url)
             
-            async with self.session.get(url, timeout=10) as response:
+            async with self.session.get(url, timeout=10, headers={'User-Agent': self.user_agent}) as response:
                 if response.status != 200:
-                    logger.debug(f"Страница не найдена: {response.status}")
+                    logger.debug("Страница не найдена: %s", response.status)
                     return None
                 
                 content = await response.text()
-                soup = BeautifulSoup(content, 'html.parser')
-                
-                # Ищем цены на странице
-                price_data = {'ton': None, 'usdt': None, 'rub': None}
-                
-                # Ищем все div с ценами
-                price_divs = soup.find_all('div', class_=re.compile(r'price', re.I))
-                
-                for div in price_divs:
-                    text = div.get_text(strip=True)
-                    
-                    # Ищем TON
-                    ton_match = re.search(r'([\d\.,]+)\s*TON', text, re.I)
-                    if ton_match:
-                        try:
-                            ton_price = ton_match.group(1).replace(',', '')
-                            price_data['ton'] = float(ton_price)
-                        except:
-                            pass
-                    
-                    # Ищем USDT
-                    usdt_match = re.search(r'([\d\.,]+)\s*USDT', text, re.I)
-                    if usdt_match:
-                        try:
-                            usdt_price = usdt_match.group(1).replace(',', '')
-                            price_data['usdt'] = float(usdt_price)
-                        except:
-                            pass
-                    
-                    # Ищем RUB
-                    rub_match = re.search(r'([\d\.,]+)\s*RUB', text, re.I)
-                    if rub_match:
-                        try:
-                            rub_price = rub_match.group(1).replace(',', '')
-                            price_data['rub'] = float(rub_price)
-                        except:
-                            pass
-                
-                # Если не нашли в div, ищем во всем тексте
-                if not any(price_data.values()):
-                    all_text = soup.get_text()
-                    
-                    ton_matches = re.findall(r'([\d\.,]+)\s*TON', all_text, re.I)
-                    if ton_matches:
-                        try:
-                            price_data['ton'] = float(ton_matches[-1].replace(',', ''))
-                        except:
-                            pass
-                    
-                    usdt_matches = re.findall(r'([\d\.,]+)\s*USDT', all_text, re.I)
-                    if usdt_matches:
-                        try:
-                            price_data['usdt'] = float(usdt_matches[-1].replace(',', ''))
-                        except:
-                            pass
-                    
-                    rub_matches = re.findall(r'([\d\.,]+)\s*RUB', all_text, re.I)
-                    if rub_matches:
-                        try:
-                            price_data['rub'] = float(rub_matches[-1].replace(',', ''))
-                        except:
-                            pass
+                if self.parse_pool is not None:
+                    price_data = await self.parse_pool.call(extract_price_data, content)
+                else:
+                    price_data = extract_price_data(content)
                 
                 if any(price_data.values()):
-                    price_cache[cache_key] = (price_data, current_time)
+                    remember('price', cache_key, price_data, current_time)
                     return price_data
                 
                 return None
                 
         except Exception as e:
-            logger.debug(f"Ошибка получения цены для {gift_name}: {e}")
+            self.stats['errors'] += 1
+            logger.debug("Ошибка получения цены для %s: %s", gift_name, e)
             return None
+        finally:
+            PRICE_FETCH_SECONDS.observe(time.perf_counter() - started)
 
 class Parcer:
-    def __init__(self):
-        self.session = None
+    def __init__(self, session: Optional[aiohttp.ClientSession] = None, html_backend: Optional[str] = None,
+                 parse_pool: Optional[ParsePool] = None):
+        self.session = session
+        self.html_backend = get_backend(html_backend)
+        # Пул процессов для разбора; без него страницы разбираются прямо в цикле
+        self.parse_pool = parse_pool
+        # Кнопка цен зависит только от подарка: одна на price_url
+        self._price_buttons: Dict[str, InlineKeyboardButton] = {}
+        # Общий планировщик для служебных запросов, задаётся через set_scheduler()
+        self.scheduler = None
         self.price_parser = None
         self.current_user_agent = random.choice(USER_AGENTS)
     
     def extract_gift_name(self, url: str) -> str:
         """Извлекает название подарка из URL"""
         try:
-            parts = url.rstrip('-').split('/')
-            gift_part = parts[-1] if parts else ""
-            
-            # Преобразуем kebab-case в читаемое имя
-            name_parts = gift_part.split('-')
-            name = ' '.join(part.capitalize() for part in name_parts if part)
-            
-            # Специальные случаи
-            special_cases = {
-                'Bdaycandle': 'B-day Candle',
-                'Durovscap': "Durov's Cap",
-                'Nekobucket': 'Neko Bucket',
-                'Blingbinky': 'Bling Binky',
-                'Springbasket': 'Spring Basket',
-                'Victorymedal': 'Victory Medal',
-                'Spicedwine': 'Spiced Wine',
-                'Snowmittens': 'Snow Mittens',
-                'Lushbouquet': 'Lush Bouquet',
-                'Whipcupcake': 'Whip Cupcake',
-                'Winterwreath': 'Winter Wreath',
-                'Snowglobe': 'Snow Globe',
-                'Santahat': 'Santa Hat',
-                'Bunnymuffin': 'Bunny Muffin',
-                'Candycane': 'Candy Cane',
-                'Eternalrose': 'Eternal Rose',
-                'Astralshard': 'Astral Shard',
-                'Cookieheart': 'Cookie Heart',
-                'Crystalball': 'Crystal Ball',
-                'Deskcalendar': 'Desk Calendar',
-                'Diamondring': 'Diamond Ring',
-                'Electricskull': 'Electric Skull',
-                'Eternalcandle': 'Eternal Candle',
-                'Evileye': 'Evil Eye',
-                'Flyingbroom': 'Flying Broom',
-                'Genielamp': 'Genie Lamp',
-                'Gingercookie': 'Ginger Cookie',
-                'Hangingstar': 'Hanging Star',
-                'Hexpot': 'Hex Pot',
-                'Homemadecake': 'Homemade Cake',
-                'Hypnolollipop': 'Hypno Lollipop',
-                'Iongem': 'Ion Gem',
-                'Jackinthebox': 'Jack in the Box',
-                'Jellybunny': 'Jelly Bunny',
-                'Jesterhat': 'Jester Hat',
-                'Jinglebells': 'Jingle Bells',
-                'Kissedfrog': 'Kissed Frog',
-                'Lolpop': 'Lol Pop',
-                'Lootbag': 'Loot Bag',
-                'Lovecandle': 'Love Candle',
-                'Lovepotion': 'Love Potion',
-                'Lunarsnake': 'Lunar Snake',
-                'Madpumpkin': 'Mad Pumpkin',
-                'Magicpotion': 'Magic Potion',
-                'Minioscar': 'Mini Oscar',
-                'Nekohelmet': 'Neko Helmet',
-                'Partysparkler': 'Party Sparkler',
-                'Perfumebottle': 'Perfume Bottle',
-                'Plushpepe': 'Plush Pepe',
-                'Preciouspeach': 'Precious Peach',
-                'Recordplayer': 'Record Player',
-                'Sakuraflower': 'Sakura Flower',
-                'Scaredcat': 'Scared Cat',
-                'Sharptongue': 'Sharp Tongue',
-                'Signetring': 'Signet Ring',
-                'Skullflower': 'Skull Flower',
-                'Sleighbell': 'Sleigh Bell',
-                'Snakebox': 'Snake Box',
-                'Snoopcigar': 'Snoop Cigar',
-                'Snoopdogg': 'Snoop Dogg',
-                'Spyagaric': 'Spy Agaric',
-                'Starnotepad': 'Star Notepad',
-                'Swisswatch': 'Swiss Watch',
-                'Tamagadget': 'Tama Gadget',
-                'Tophat': 'Top Hat',
-                'Toybear': 'Toy Bear',
-                'Trappedheart': 'Trapped Heart',
-                'Valentinebox': 'Valentine Box',
-                'Vintagecigar': 'Vintage Cigar',
-                'Voodoodoll': 'Voodoo Doll',
-                'Winterwreath': 'Winter Wreath',
-                'Witchhat': 'Witch Hat',
-                'Xmasstocking': 'Xmas Stocking',
-                'Westside': 'Westside Sign',
-                'Skystilettos': 'Sky Stilettos',
-                'Artisanbrick': 'Artisan Brick',
-                'Instantramen': 'Instant Ramen',
-                'Jollychimp': 'Jolly Chimp',
-                'Icecream': 'Ice Cream',
-                'Freshsocks': 'Fresh Socks',
-                'Gemsignet': 'Gem Signet',
-                'Heroichelmet': 'Heroic Helmet',
-                'Happybrownie': 'Happy Brownie',
-                'Heartlocket': 'Heart Locket',
-                'Holidaydrink': 'Holiday Drink',
-                'Inputkey': 'Input Key',
-                'Ionicdryer': 'Ionic Dryer',
-                'Joyfulbundle': 'Joyful Bundle',
-                'Lightsword': 'Light Sword',
-                'Lowrider': 'Low Rider',
-                'Moonpendant': 'Moon Pendant',
-                'Nailbracelet': 'Nail Bracelet',
-                'Petsnake': 'Pet Snake',
-                'Restlessbar': 'Restless Bar',
-                'Swagbag': 'Swag Bag',
-                'MoneyPot': 'Money Pot',
-                'Prettyposy': 'Pretty Posy',
-                'Bondedring': 'Bonded Ring',
-                'Cloverpin': 'Clover Pin',
-                'Cupidcharm': 'Cupid Charm',
-                'Faithamulet': 'Faith Amulet',
-                'MousseCake': 'Mousse Cake',
-                'Mightyarm': 'Mighty Arm',
-            }
-            
-            simple_name = ''.join(part.capitalize() for part in name_parts)
-            if simple_name in special_cases:
-                return special_cases[simple_name]
-            
-            return name if name else "Unknown"
+            return get_registry().name_for_url(url)
         except Exception:
             return "Unknown"
     
     async def __aenter__(self):
         self.current_user_agent = random.choice(USER_AGENTS)
-        self.session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=10),
-            headers={
-                'User-Agent': self.current_user_agent,
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-                'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'DNT': '1',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-            }
-        )
-        self.price_parser = PriceParser()
+        if self.session is None:
+            self.session = get_session()
+        self.price_parser = PriceParser(self.session, self.parse_pool)
+        self.price_parser.scheduler = self.scheduler
         await self.price_parser.__aenter__()
         return self
 
     async def __aexit__(self, exc_type, exc, tb):
-        if self.session:
-            await self.session.close()
+        # Сессия общая для процесса, закрывается через http_client.close_session()
         if self.price_parser:
             await self.price_parser.__aexit__(exc_type, exc, tb)
     
     def rotate_user_agent(self):
         self.current_user_agent = random.choice(USER_AGENTS)
-        if self.session:
-            self.session.headers.update({'User-Agent': self.current_user_agent})
+
+    def set_scheduler(self, scheduler):
+        """Пускает служебные запросы и загрузку цен через общий бюджет CrawlScheduler"""
+        self.scheduler = scheduler
+        if self.price_parser:
+            self.price_parser.scheduler = scheduler
+
+    async def _request(self, kind: str, func, *args, gift_id: Optional[int] = None,
+                       delay: Optional[float] = None):
+        """Служебный запрос через планировщик, если он задан, иначе напрямую"""
+        if self.scheduler is None:
+            return await func(*args)
+        return await self.scheduler.call(kind, func, *args, gift_id=gift_id, delay=delay)
+
+    def _get(self, url: str, timeout: float):
+        """GET через общий пул со своим User-Agent"""
+        return self.session.get(url, timeout=timeout, headers={'User-Agent': self.current_user_agent})
+
+    async def _parse(self, response, content: bytes) -> GiftRecord:
+        """Разбор страницы в пуле процессов или выбранным бэкендом, с замером времени"""
+        started = time.perf_counter()
+        if self.parse_pool is not None:
+            page = await self.parse_pool.parse(content, response.charset or 'utf-8')
+            backend_name = self.parse_pool.name
+        else:
+            page = self.html_backend.parse(decode_page(response, content))
+            backend_name = self.html_backend.name
+        PARSE_SECONDS.observe(time.perf_counter() - started, backend_name)
+        return page
 
     async def fetch(self, num: str, url: str) -> Optional[Dict]:
         """Получает информацию о подарке"""
+        with FETCH_SECONDS.time():
+            return await self._fetch(num, url)
+
+    async def _fetch(self, num: str, url: str) -> Optional[Dict]:
         try:
             full_url = url + num
             
-            async with self.session.get(full_url, timeout=5) as response:
+            async with self._get(full_url, timeout=5) as response:
+                FETCH_STATUS.inc(response.status)
                 if response.status != 200:
+                    FETCH_OUTCOMES.inc('bad_status')
                     return None
                 
-                content = await response.text()
-                soup = BeautifulSoup(content, 'html.parser')
-                title = soup.title.string if soup.title else ''
+                content = await response.read()
+                if sniff_gift_page(content) is False:
+                    FETCH_OUTCOMES.inc('not_gift')
+                    return None
                 
-                if not title or "gift" not in title.lower():
+                record = await self._parse(response, content)
+                if not record.is_gift:
+                    FETCH_OUTCOMES.inc('not_gift')
                     return None
+                FETCH_OUTCOMES.inc('gift')
                 
-                # Парсим информацию о владельце
-                owner_info = self.parse_owner_info(soup)
                 gift_link = full_url
                 gift_name = self.extract_gift_name(url)
                 
-                characteristics = self.parse_characteristics_from_table(soup)
-                issued_info = self.parse_issued_info(soup)
-                
-                # Получаем информацию о ценах
-                price_info = await self.get_price_info(gift_name, characteristics)
-                
-                message = self.format_message(
-                    gift_name, num, characteristics, price_info, 
-                    issued_info, owner_info, gift_link
-                )
-                
-                keyboard = self.create_keyboard_with_show_gift(gift_link, owner_info, price_info)
+                # Цена только из кэша: её держит тёплой фоновое обновление,
+                # а сам минт не должен ждать telegifter
+                price_info = self.peek_price_info(gift_name)
                 
+                # Текст и клавиатура собираются при отправке: render_result / payload
                 return {
-                    'message': message,
+                    'gift_name': gift_name,
                     'num': num,
                     'link': gift_link,
-                    'keyboard': keyboard,
-                    'owner_info': owner_info,
-                    'issued_info': issued_info,
-                    'characteristics': characteristics,
+                    'record': record,
                     'price_info': price_info
                 }
                 
         except Exception as e:
-            logger.debug(f"Ошибка fetch для {url}{num}: {e}")
+            FETCH_OUTCOMES.inc(type(e).__name__)
+            logger.debug("Ошибка fetch для %s%s: %s", url, num, e)
             return None
 
     def parse_owner_info(self, soup):
         """Парсит информацию о владельце"""
-        try:
-            # Ищем все ссылки с t.me
-            for a_tag in soup.find_all('a', href=True):
-                href = a_tag.get('href', '')
-                
-                if 't.me/' in href or 'tg://' in href:
-                    name = a_tag.get_text(strip=True)
-                    
-                    if not name or name in ['Telegram', 'Share', 'Open', 'Forward', 'Preview', 'View in Telegram']:
-                        continue
-                    
-                    username = None
-                    user_id = None
-                    
-                    # Извлекаем user_id или username
-                    if 't.me/' in href:
-                        match = re.search(r't\.me/([a-zA-Z0-9_]+)', href)
-                        if match:
-                            extracted = match.group(1)
-                            if extracted.startswith('id') and extracted[2:].isdigit():
-                                user_id = extracted[2:]
-                            else:
-                                username = extracted
-                    
-                    elif 'tg://' in href:
-                        match = re.search(r'tg://(?:user|openmessage)\?id=(\d+)', href)
-                        if match:
-                            user_id = match.group(1)
-                    
-                    name = re.sub(r'[^\w\s@\-\.]', '', name).strip()
-                    
-                    if not name:
-                        continue
-                    
-                    return {
-                        'name': html.escape(name),
-                        'username': username,
-                        'user_id': user_id,
-                        'href': href
-                    }
-            
-            return None
-        except Exception:
-            return None
+        return soup_record(soup).owner
+
+    def render_result(self, result: Dict) -> Tuple[str, Dict]:
+        """Текст и reply_markup находки из Parcer.fetch"""
+        record = result['record']
+        message = self.format_message(
+            result['gift_name'], result['num'], record.characteristics, result['price_info'],
+            record.issued_info, record.owner, result['link']
+        )
+        keyboard = self.create_keyboard_with_show_gift(result['link'], record.owner, result['price_info'])
+        return message, {'reply_markup': keyboard}
+
+    def payload(self, result: Dict) -> Payload:
+        """Ленивое сообщение для очереди отправки, общее для всех чатов"""
+        return Payload(lambda: self.render_result(result))
 
     def format_message(self, gift_name, num, characteristics, price_info, issued_info, owner_info, gift_link):
         """Форматирует сообщение ТОЧНО как в примере"""
@@ -428,45 +437,15 @@ class Parcer:
         if characteristics:
             message_lines.append("<b>ХАРАКТЕРИСТИКИ:</b>")
             for char_type, char_text, percent in characteristics:
-                if percent is not None:
-                    # Форматируем проценты курсивом
-                    char_display = f"{char_text} <i>{percent}%</i>"
-                    
-                    # Добавляем эмодзи в зависимости от процента
-                    if percent < 0.5:
-                        char_display += " 🔥🔥🔥"
-                    elif percent < 1:
-                        char_display += " 💍"
-                    
-                    # Специальные случаи для фона
-                    if char_type.lower() == 'фон' and char_text.lower() in ['onyx black', 'black']:
-                        char_display += " 🔥"
-                else:
-                    char_display = char_text
-                
+                char_display = self.format_characteristic(char_type, char_text, percent)
                 message_lines.append(f"- <b>{char_type}:</b> {char_display}")
         
         # Issued информация
         if issued_info:
-            issued, total = issued_info
-            issued_formatted = f"{issued:,}".replace(',', ' ')
-            total_formatted = f"{total:,}".replace(',', ' ')
-            message_lines.append(f"\n<b>Выпущено:</b> {issued_formatted}/{total_formatted} issued")
+            message_lines.append(f"\n<b>Выпущено:</b> {self.format_issued(issued_info)} issued")
         
         # Цены
-        if price_info and price_info.get('average_price'):
-            price = price_info['average_price']
-            
-            if price.get('ton'):
-                message_lines.append(f"<b>Цена:</b> {price['ton']} TON")
-            
-            if price.get('usdt'):
-                message_lines.append(f"<b>Цена:</b> {price['usdt']} USDT")
-            
-            if price.get('rub'):
-                message_lines.append(f"<b>Цена:</b> {price['rub']} RUB")
-        else:
-            message_lines.append("<b>Цена:</b> Не найдена")
+        message_lines.extend(self.format_price_lines(price_info))
         
         # Владелец с ссылкой
         if owner_info and owner_info.get('name'):
@@ -488,6 +467,41 @@ class Parcer:
         
         return "\n".join(message_lines)
 
+    def format_characteristic(self, char_type, char_text, percent):
+        """Значение характеристики с процентом и отметками редкости"""
+        if percent is None:
+            return char_text
+        
+        # Форматируем проценты курсивом
+        char_display = f"{char_text} <i>{percent}%</i>"
+        
+        # Добавляем эмодзи в зависимости от процента
+        if percent < 0.5:
+            char_display += " 🔥🔥🔥"
+        elif percent < 1:
+            char_display += " 💍"
+        
+        # Специальные случаи для фона
+        if char_type.lower() == 'фон' and char_text.lower() in ['onyx black', 'black']:
+            char_display += " 🔥"
+        return char_display
+
+    def format_issued(self, issued_info):
+        issued, total = issued_info
+        issued_formatted = f"{issued:,}".replace(',', ' ')
+        total_formatted = f"{total:,}".replace(',', ' ')
+        return f"{issued_formatted}/{total_formatted}"
+
+    def format_price_lines(self, price_info):
+        if not (price_info and price_info.get('average_price')):
+            return ["<b>Цена:</b> Не найдена"]
+        price = price_info['average_price']
+        lines = []
+        for currency in ('ton', 'usdt', 'rub'):
+            if price.get(currency):
+                lines.append(f"<b>Цена:</b> {price[currency]} {currency.upper()}")
+        return lines
+
     def format_owner_display(self, owner_info):
         """Форматирует отображение владельца"""
         name = owner_info.get('name', 'Unknown')
@@ -552,196 +566,177 @@ class Parcer:
         
         # Кнопка для просмотра цен – серая (secondary)
         if price_info and price_info.get('price_url'):
-            inline_keyboard.append([InlineKeyboardButton(
-                text="💰 Цены на Telegifter", 
-                url=price_info['price_url'],
-                style='secondary'       # серый / нейтральный
-            )])
+            inline_keyboard.append([self.price_button(price_info['price_url'])])
         
         return InlineKeyboardMarkup(inline_keyboard=inline_keyboard)
 
+    def price_button(self, price_url):
+        button = self._price_buttons.get(price_url)
+        if button is None:
+            button = InlineKeyboardButton(
+                text="💰 Цены на Telegifter", 
+                url=price_url,
+                style='secondary'       # серый / нейтральный
+            )
+            self._price_buttons[price_url] = button
+        return button
+
     async def get_price_info(self, gift_name, characteristics):
         """Получает информацию о ценах для подарка"""
         try:
             price_data = await self.price_parser.get_gift_price_info(gift_name)
-            if not price_data:
-                return None
-            
-            return {
-                'average_price': price_data,
-                'price_url': self.price_parser.base_url + self.price_parser.normalize_gift_name(gift_name) + "/"
-            }
+            return self.build_price_info(gift_name, price_data)
             
         except Exception as e:
-            logger.debug(f"Ошибка получения цены: {e}")
+            logger.debug("Ошибка получения цены: %s", e)
             return None
 
+    def peek_price_info(self, gift_name):
+        """Цена из кэша без сетевого запроса; при промахе догружает её в фоне"""
+        price_data = self.price_parser.peek_gift_price_info(gift_name)
+        if not price_data:
+            self.price_parser.warm(gift_name)
+        return self.build_price_info(gift_name, price_data)
+
+    def build_price_info(self, gift_name, price_data):
+        if not price_data:
+            return None
+        return {
+            'average_price': price_data,
+            'price_url': self.price_parser.base_url + self.price_parser.normalize_gift_name(gift_name) + "/"
+        }
+
     def parse_characteristics_from_table(self, soup):
         """Парсит характеристики из таблицы"""
-        try:
-            characteristics = []
-            table = soup.find('table', class_='tgme_gift_table')
-            if not table:
-                return []
-            
-            for row in table.find_all('tr'):
-                th = row.find('th')
-                td = row.find('td')
-                if th and td:
-                    char_type = th.text.strip().lower()
-                    if char_type in ['owner', 'quantity']:
-                        continue
-                    
-                    char_text = td.get_text(strip=True)
-                    
-                    # Ищем процент в скобках
-                    percent = None
-                    percent_match = re.search(r'([\d\.]+)%', char_text)
-                    if percent_match:
-                        try:
-                            percent = float(percent_match.group(1))
-                            # Убираем процент из текста
-                            char_text = re.sub(r'\s*[\d\.]+%', '', char_text).strip()
-                        except:
-                            pass
-                    
-                    # Переводим на русский
-                    char_translation = {
-                        'model': 'Модель',
-                        'backdrop': 'Фон',
-                        'symbol': 'Символ',
-                        'модель': 'Модель',
-                        'фон': 'Фон',
-                        'символ': 'Символ'
-                    }
-                    
-                    char_type_ru = char_translation.get(char_type, char_type.capitalize())
-                    
-                    if char_text:
-                        characteristics.append((char_type_ru, char_text, percent))
-            
-            return characteristics
-            
-        except Exception:
-            return []
+        return soup_record(soup).characteristics
 
     def parse_issued_info(self, soup):
         """Парсит информацию о выпущенных подарках"""
-        try:
-            table = soup.find('table', class_='tgme_gift_table')
-            if table:
-                for row in table.find_all('tr'):
-                    th = row.find('th')
-                    td = row.find('td')
-                    if th and td:
-                        th_text = th.text.strip().lower()
-                        td_text = td.text.strip()
-                        
-                        if any(keyword in th_text for keyword in ['quantity', 'выпущено', 'issued']):
-                            td_text = td_text.replace(' issued', '').replace(' issued', '')
-                            
-                            match = re.search(r'([\d\s,]+)\s*[/из]?\s*([\d\s,]+)', td_text)
-                            if match:
-                                issued_str = match.group(1).replace(' ', '').replace(',', '').replace('\xa0', '')
-                                total_str = match.group(2).replace(' ', '').replace(',', '').replace('\xa0', '')
-                                
-                                try:
-                                    issued = int(issued_str)
-                                    total = int(total_str)
-                                    return (issued, total)
-                                except:
-                                    pass
-            
-            all_text = soup.get_text()
-            
-            patterns = [
-                r'(\d[\d\s,]*)\s*/\s*(\d[\d\s,]*)\s*issued',
-                r'issued\s*(\d[\d\s,]*)\s*of\s*(\d[\d\s,]*)',
-                r'(\d[\d\s,]*)\s*из\s*(\d[\d\s,]*)\s*issued',
-                r'(\d[\d\s,]*)\s*из\s*(\d[\d\s,]*)',
-            ]
-            
-            for pattern in patterns:
-                match = re.search(pattern, all_text, re.IGNORECASE)
-                if match:
-                    try:
-                        issued_str = match.group(1).replace(' ', '').replace(',', '').replace('\xa0', '')
-                        total_str = match.group(2).replace(' ', '').replace(',', '').replace('\xa0', '')
-                        
-                        issued = int(issued_str)
-                        total = int(total_str)
-                        return (issued, total)
-                    except:
-                        continue
-            
-            return None
-        except Exception:
-            return None
+        return soup_record(soup).issued_info
 
-    async def get_current_issued_count(self, url: str) -> int:
-        """Получает текущее количество выпущенных подарков"""
+    async def get_current_issued_count(self, url: str, fresh: bool = False, page_num: int = 1,
+                                       gift_id: Optional[int] = None) -> int:
+        """Получает текущее количество выпущенных подарков.
+        
+        fresh — читать счётчик со страницы, минуя кэш; page_num — любой уже выпущенный номер.
+        fresh-опрос режима 'frontier' идёт в очереди наравне с проверками номеров
+        и не пишется в постоянный кэш: значение устаревает через секунду.
+        """
+        current_time = time.time()
+        if not fresh and url in issued_count_cache:
+            cached_count, timestamp = issued_count_cache[url]
+            if current_time - timestamp < ISSUED_CACHE_DURATION:
+                return cached_count
+        return await self._request('issued', self._read_issued_count, url, page_num, not fresh,
+                                   gift_id=gift_id, delay=0 if fresh else None)
+
+    async def _read_issued_count(self, url: str, page_num: int, persist: bool = True) -> int:
+        current_time = time.time()
         try:
-            test_url = url + "1"
-            async with self.session.get(test_url, timeout=5) as response:
+            test_url = url + str(page_num)
+            async with self._get(test_url, timeout=5) as response:
                 if response.status == 200:
-                    content = await response.text()
-                    soup = BeautifulSoup(content, 'html.parser')
-                    
-                    issued_info = self.parse_issued_info(soup)
-                    if issued_info:
-                        return issued_info[0]
+                    content = await response.read()
+                    record = await self._parse(response, content)
+                    if record.issued is not None:
+                        if persist:
+                            remember('issued', url, record.issued, current_time)
+                        else:
+                            issued_count_cache[url] = (record.issued, current_time)
+                        return record.issued
                 
                 return 0
         except Exception:
             return 0
 
-    async def get_last_nft_number(self, url: str, gift_name: str) -> Optional[int]:
-        """Получает номер последнего NFT для подарка"""
+    async def nft_exists(self, url: str, num: int, gift_id: Optional[int] = None) -> bool:
+        """Проверяет по заголовку, что номер уже выпущен"""
+        return await self._request('frontier', self._nft_exists, url, num, gift_id=gift_id)
+
+    async def _nft_exists(self, url: str, num: int) -> bool:
+        try:
+            async with self._get(url + str(num), timeout=3) as response:
+                if response.status != 200:
+                    return False
+                content = await response.read()
+                is_gift = sniff_gift_page(content)
+                if is_gift is None:
+                    is_gift = (await self._parse(response, content)).is_gift
+                return is_gift
+        except Exception:
+            return False
+
+    async def locate_frontier(self, url: str, hint: int = 0,
+                              probes: int = FRONTIER_PROBES_PER_ROUND, gift_id: Optional[int] = None) -> int:
+        """Находит точный номер последнего минта: разгон от hint, затем k-ичный поиск.
+        
+        Каждый раунд отправляет probes запросов параллельно. Возвращает 0, если не выпущено ничего.
+        """
+        async def check(numbers: List[int]) -> List[bool]:
+            return list(await asyncio.gather(*(self.nft_exists(url, num, gift_id) for num in numbers)))
+
+        low = 0       # последний номер, который точно существует
+        high = None   # первый номер, которого точно нет
+        if hint > 0:
+            hint = min(hint, FRONTIER_MAX_NUMBER)
+            if (await check([hint]))[0]:
+                low = hint
+            else:
+                high = hint
+
+        # Разгон: шаги 1, 2, 4, ... от low, пока не упрёмся в пустой номер
+        step = 1
+        while high is None:
+            candidates = sorted({min(low + step * (1 << i), FRONTIER_MAX_NUMBER) for i in range(probes)})
+            results = await check(candidates)
+            for num, exists in zip(candidates, results):
+                if not exists:
+                    high = num
+                    break
+                low = num
+            if low >= FRONTIER_MAX_NUMBER:
+                return low
+            step <<= probes
+            await asyncio.sleep(0.01)
+
+        # Сужение: делим (low, high) на probes + 1 частей за раунд
+        while high - low > 1:
+            span = high - low
+            candidates = sorted({low + span * i // (probes + 1) for i in range(1, probes + 1)} - {low})
+            results = await check(candidates)
+            for num, exists in zip(candidates, results):
+                if not exists:
+                    high = num
+                    break
+                low = num
+            await asyncio.sleep(0.01)
+        return low
+
+    async def get_last_nft_number(self, url: str, gift_name: str, hint: int = 0,
+                                  gift_id: Optional[int] = None) -> Optional[int]:
+        """Получает номер последнего NFT для подарка; hint — последний известный номер"""
         cache_key = gift_name.lower()
         current_time = time.time()
         
         if cache_key in last_nft_number_cache:
             cached_data, timestamp = last_nft_number_cache[cache_key]
-            if current_time - timestamp < 300:
+            if current_time - timestamp < FRONTIER_CACHE_DURATION:
                 return cached_data
+            # Устаревшее значение всё ещё хорошая точка старта для поиска
+            hint = max(hint, cached_data or 0)
         
         try:
             # Пробуем получить issued count
-            issued_count = await self.get_current_issued_count(url)
+            issued_count = await self.get_current_issued_count(url, gift_id=gift_id)
             if issued_count and issued_count > 0:
-                last_nft_number_cache[cache_key] = (issued_count, current_time)
+                remember('frontier', cache_key, issued_count, current_time)
                 return issued_count
             
-            # Если не получили, ищем бинарным поиском
-            low = 1
-            high = 1000000
-            last_found = 0
-            
-            while low <= high and (high - low) > 100:
-                mid = (low + high) // 2
-                
-                try:
-                    test_url = url + str(mid)
-                    async with self.session.get(test_url, timeout=3) as response:
-                        if response.status == 200:
-                            content = await response.text()
-                            soup = BeautifulSoup(content, 'html.parser')
-                            title = soup.title.string if soup.title else ''
-                            
-                            if "gift" in title.lower():
-                                last_found = mid
-                                low = mid + 1
-                            else:
-                                high = mid - 1
-                        else:
-                            high = mid - 1
-                except Exception:
-                    high = mid - 1
-                
-                await asyncio.sleep(0.01)
+            # Если не получили, ищем фронтир от последней известной позиции
+            last_found = await self.locate_frontier(url, hint, gift_id=gift_id)
             
             if last_found > 0:
-                last_nft_number_cache[cache_key] = (last_found, current_time)
+                remember('frontier', cache_key, last_found, current_time)
                 return last_found
             
             return None
@@ -751,19 +746,21 @@ class Parcer:
 
     async def check_promarket_gift(self, gift_name: str) -> bool:
         """Проверяет, есть ли подарок в премаркете"""
+        return await self._request('promarket', self._check_promarket_gift, gift_name)
+
+    async def _check_promarket_gift(self, gift_name: str) -> bool:
         try:
-            normalized_name = gift_name.lower().replace(' ', '-')
-            test_url = f"https://t.me/nft/{normalized_name}-1"
+            test_url = get_registry().nft_url(gift_name) + "1"
             
-            async with self.session.get(test_url, timeout=5) as response:
+            async with self._get(test_url, timeout=5) as response:
                 if response.status == 200:
-                    content = await response.text()
-                    soup = BeautifulSoup(content, 'html.parser')
-                    title = soup.title.string if soup.title else ''
+                    content = await response.read()
+                    if sniff_gift_page(content) is False:
+                        return False
                     
-                    if title and "gift" in title.lower():
-                        issued_info = self.parse_issued_info(soup)
-                        if issued_info and issued_info[0] == 0:
+                    record = await self._parse(response, content)
+                    if record.is_gift:
+                        if record.issued == 0:
                             return False
                         return True
                 
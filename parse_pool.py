@@ -0,0 +1,162 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from html_backends import get_backend
+from logging_config import setup_logger, use_worker_logging
+
+logger = setup_logger('parse_pool')
+
+# Разбор страниц в отдельных процессах, чтобы он не тормозил сетевой цикл
+PARSE_POOL_SETTINGS = {
+    'workers': min(4, max(1, (os.cpu_count() or 2) - 1)),  # 0 — разбирать в цикле, как раньше
+    'batch_size': 16,        # страниц в одной передаче воркеру
+    'batch_delay': 0.002,    # сколько ждать добора пачки, секунд
+}
+
+PageItem = Tuple[bytes, str]
+
+_worker_backend = None
+
+
+def _init_worker(backend_name: Optional[str]):
+    global _worker_backend
+    # Ctrl+C получает основной процесс, он же и закрывает пул
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    use_worker_logging()
+    _worker_backend = get_backend(backend_name)
+
+
+def _parse_batch(items: List[PageItem]) -> List[Any]:
+    """Разбор пачки страниц в воркере; ошибка одной страницы не валит остальные"""
+    results = []
+    for content, encoding in items:
+        try:
+            results.append(_worker_backend.parse(content.decode(encoding, errors='replace')))
+        except Exception as e:
+            results.append(e)
+    return results
+
+
+def _warmup() -> int:
+    return os.getpid()
+
+
+class ParsePool:
+    """Пул процессов для разбора страниц t.me с пачечной отправкой.
+
+    parse() копит страницы и отдаёт их воркеру пачкой по batch_size или через
+    batch_delay, чтобы не платить за передачу между процессами на каждую страницу.
+    Без пула (workers=0 или нет fork) разбирает страницы прямо в цикле.
+    """
+
+    def __init__(self, backend_name: Optional[str] = None, settings: Optional[Dict[str, Any]] = None):
+        self.settings = dict(PARSE_POOL_SETTINGS, **(settings or {}))
+        self.backend = get_backend(backend_name)
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self._pending: List[Tuple[bytes, str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self.batches = 0
+        self.pages = 0
+
+    @property
+    def name(self) -> str:
+        return f"{self.backend.name}/pool" if self.executor else self.backend.name
+
+    async def start(self):
+        workers = int(self.settings['workers'])
+        if workers <= 0:
+            return
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            # spawn заново выполняет модульный код main.py (настройки, логгеры) в каждом воркере
+            logger.warning("⚠️ Нет fork: разбор страниц остаётся в основном процессе")
+            return
+        self.executor = ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context('fork'),
+            initializer=_init_worker, initargs=(self.backend.name,)
+        )
+        # С fork пул поднимает все процессы на первой задаче: делаем это до сетевых потоков
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.executor, _warmup) for _ in range(workers)))
+        logger.info(f"🧵 Разбор страниц в {workers} процессах ({self.backend.name})")
+
+    def parse_inline(self, content: bytes, encoding: str):
+        return self.backend.parse(content.decode(encoding, errors='replace'))
+
+    async def parse(self, content: bytes, encoding: str = 'utf-8'):
+        if self.executor is None:
+            return self.parse_inline(content, encoding)
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((content, encoding, future))
+        if len(self._pending) >= self.settings['batch_size']:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.settings['batch_delay'], self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self.batches += 1
+        self.pages += len(batch)
+        try:
+            task = asyncio.get_running_loop().run_in_executor(
+                self.executor, _parse_batch, [(content, encoding) for content, encoding, _ in batch]
+            )
+        except (BrokenProcessPool, RuntimeError) as e:
+            self._fallback(batch, e)
+            return
+        task.add_done_callback(lambda done: self._deliver(batch, done))
+
+    def _deliver(self, batch: List[Tuple[bytes, str, asyncio.Future]], done: asyncio.Future):
+        if done.cancelled() or done.exception() is not None:
+            self._fallback(batch, done.exception() if not done.cancelled() else None)
+            return
+        for (_, _, future), result in zip(batch, done.result()):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _fallback(self, batch: List[Tuple[bytes, str, asyncio.Future]], error: Optional[BaseException]):
+        """Пул упал или закрыт: дорабатываем пачку в цикле и дальше обходимся без пула"""
+        if self.executor is not None and isinstance(error, BrokenProcessPool):
+            logger.error(f"❌ Пул разбора страниц сломан, разбираем в основном процессе: {error}")
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        for content, encoding, future in batch:
+            if future.done():
+                continue
+            try:
+                future.set_result(self.parse_inline(content, encoding))
+            except Exception as e:
+                future.set_exception(e)
+
+    async def call(self, func: Callable, *args):
+        """Разовая задача в пуле (например, разбор цены); без пула — прямо здесь"""
+        if self.executor is None:
+            return func(*args)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        except BrokenProcessPool:
+            return func(*args)
+
+    def close(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._fallback(self._pending, None)
+        self._pending = []
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
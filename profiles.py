@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+import signal
+from typing import Callable, Dict, List, Optional
+from config import MONITORING_SETTINGS
+from logging_config import setup_logger
+from monitoring_config import MONITORING_CONFIG, CURRENT_MODE, GIFT_PROFILES
+
+logger = setup_logger('profiles')
+
+# {"mode": "conservative", "gifts": {"61": "aggressive"}} — режим без перезапуска
+PROFILE_CONTROL_FILE = "monitoring_mode.json"
+CONTROL_CHECK_INTERVAL = 2.0
+# kill -USR1 <pid> — разгон, -USR2 — тихий режим; обратно в обычный — через файл управления.
+# SIGHUP не занимаем: закрытие терминала должно останавливать бота, а не менять режим
+SIGNAL_PROFILES = {
+    'SIGUSR1': 'aggressive',
+    'SIGUSR2': 'conservative',
+}
+
+
+class ProfileManager:
+    """Текущий режим мониторинга: общий и по отдельным подаркам, переключается на лету"""
+
+    def __init__(self, mode: str = CURRENT_MODE, gift_modes: Optional[Dict[int, str]] = None):
+        self.mode = mode
+        self.static_gift_modes = dict(GIFT_PROFILES if gift_modes is None else gift_modes)
+        self.gift_modes = dict(self.static_gift_modes)
+        self._listeners: List[Callable[[], None]] = []
+        self._control_mtime = None
+
+    def mode_for(self, gift_id: Optional[int] = None) -> str:
+        return self.gift_modes.get(gift_id, self.mode)
+
+    def profile(self, gift_id: Optional[int] = None) -> dict:
+        """Настройки режима подарка; лимит проверок номеров тихого режима берётся из config"""
+        profile = dict(MONITORING_CONFIG[self.mode_for(gift_id)])
+        if profile.get('rate_limited'):
+            profile['probe_rate'] = MONITORING_SETTINGS['rate_limit_per_second']
+        return profile
+
+    def on_change(self, callback: Callable[[], None]):
+        self._listeners.append(callback)
+
+    def _notify(self):
+        for callback in self._listeners:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"❌ Ошибка применения режима: {e}")
+
+    def set_mode(self, mode: str, gift_id: Optional[int] = None) -> bool:
+        if mode not in MONITORING_CONFIG:
+            logger.error(f"❌ Неизвестный режим мониторинга: {mode}")
+            return False
+        if gift_id is None:
+            self.mode = mode
+            logger.info(f"🎛️ Режим мониторинга: {mode}")
+        else:
+            self.gift_modes[gift_id] = mode
+            logger.info(f"🎛️ Режим мониторинга подарка {gift_id}: {mode}")
+        self._notify()
+        return True
+
+    def load(self, control: dict):
+        """Применяет содержимое файла управления целиком"""
+        mode = control.get('mode', self.mode)
+        if mode not in MONITORING_CONFIG:
+            logger.error(f"❌ Неизвестный режим мониторинга: {mode}")
+            return
+        gift_modes = dict(self.static_gift_modes)
+        for gift_id, gift_mode in (control.get('gifts') or {}).items():
+            if gift_mode in MONITORING_CONFIG:
+                gift_modes[int(gift_id)] = gift_mode
+            else:
+                logger.error(f"❌ Неизвестный режим {gift_mode} для подарка {gift_id}")
+        if mode == self.mode and gift_modes == self.gift_modes:
+            return
+        self.mode = mode
+        self.gift_modes = gift_modes
+        logger.info(f"🎛️ Режим мониторинга: {mode}, отдельно для подарков: {gift_modes or 'нет'}")
+        self._notify()
+
+    def install_signal_handlers(self):
+        """Переключение режима сигналами; на Windows сигналов нет, остаётся файл управления"""
+        loop = asyncio.get_running_loop()
+        for signal_name, mode in SIGNAL_PROFILES.items():
+            signum = getattr(signal, signal_name, None)
+            if signum is None:
+                continue
+            try:
+                loop.add_signal_handler(signum, self.set_mode, mode)
+            except (NotImplementedError, RuntimeError):
+                return
+
+    async def watch_control_file(self, path: str = PROFILE_CONTROL_FILE,
+                                 interval: float = CONTROL_CHECK_INTERVAL):
+        while True:
+            try:
+                mtime = os.path.getmtime(path) if os.path.exists(path) else None
+                if mtime is not None and mtime != self._control_mtime:
+                    self._control_mtime = mtime
+                    with open(path, 'r', encoding='utf-8') as f:
+                        self.load(json.load(f))
+            except Exception as e:
+                logger.error(f"❌ Ошибка чтения {path}: {e}")
+            await asyncio.sleep(interval)
@@ -0,0 +1,153 @@
+import asyncio
+import json
+import os
+from typing import Dict, Optional, Set
+from logging_config import setup_logger
+
+logger = setup_logger('progress_store')
+
+
+class ProgressStore:
+    """Прогресс по подаркам: снимок last_found.json плюс журнал дописываемых событий.
+
+    Каждое продвижение — одна строка в журнале, запись O(1). fsync идёт пачками,
+    а журнал периодически сворачивается в снимок через атомарную замену файла.
+    Номер подарка только растёт, поэтому повтор журнала поверх снимка безопасен.
+    """
+
+    def __init__(self, snapshot_path: str, journal_path: Optional[str] = None,
+                 fsync_batch: int = 50, fsync_interval: float = 1.0, compact_every: int = 5000):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path or snapshot_path + '.journal'
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        self.progress: Dict[str, int] = {}
+        self._journal = None
+        self._unsynced = 0
+        self._journal_records = 0
+
+    def load(self) -> Dict[str, int]:
+        """Читает снимок, проигрывает поверх него журнал и открывает журнал на дозапись"""
+        if os.path.exists(self.snapshot_path):
+            try:
+                with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                    self.progress = {str(k): int(v) for k, v in json.load(f).items()}
+            except Exception as e:
+                logger.error(f"❌ Ошибка при загрузке {self.snapshot_path}: {e}")
+
+        replayed = 0
+        torn_tail = False
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    torn_tail = not line.endswith('\n')
+                    try:
+                        record = json.loads(line)
+                        gift_id, num = str(record['g']), int(record['n'])
+                    except Exception:
+                        # Недописанная при падении строка — просто пропускаем
+                        continue
+                    if num > self.progress.get(gift_id, 0):
+                        self.progress[gift_id] = num
+                    replayed += 1
+        self._journal_records = replayed
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        if torn_tail:
+            # Отделяем недописанную строку, чтобы следующая запись не склеилась с ней
+            self._journal.write('\n')
+        logger.info(f"📂 Прогресс по {len(self.progress)} подаркам, из журнала {replayed} записей")
+        return dict(self.progress)
+
+    def get(self, gift_id) -> int:
+        return self.progress.get(str(gift_id), 0)
+
+    def advance(self, gift_id, num: int) -> bool:
+        """Фиксирует отправленный номер; меньший или равный сохранённому игнорируется"""
+        key = str(gift_id)
+        if num <= self.progress.get(key, 0):
+            return False
+        self.progress[key] = num
+        self._journal.write(json.dumps({'g': key, 'n': num}) + '\n')
+        # До ОС доходит сразу, fsync до диска — пачками
+        self._journal.flush()
+        self._unsynced += 1
+        self._journal_records += 1
+        if self._unsynced >= self.fsync_batch:
+            self.sync()
+        if self._journal_records >= self.compact_every:
+            self.compact()
+        return True
+
+    def sync(self):
+        if self._journal and self._unsynced:
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._unsynced = 0
+
+    def compact(self):
+        """Сворачивает журнал в снимок: новый снимок атомарно, затем пустой журнал"""
+        tmp_path = self.snapshot_path + '.tmp'
+        try:
+            self.sync()
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.progress, f, indent=2, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.snapshot_path)
+            if self._journal:
+                self._journal.close()
+            self._journal = open(self.journal_path, 'w', encoding='utf-8')
+            self._journal_records = 0
+            logger.debug(f"💾 Журнал свёрнут в {self.snapshot_path}: {len(self.progress)} записей")
+        except Exception as e:
+            logger.error(f"❌ Ошибка при сохранении {self.snapshot_path}: {e}")
+            if self._journal is None or self._journal.closed:
+                self._journal = open(self.journal_path, 'a', encoding='utf-8')
+
+    async def sync_loop(self):
+        """Догоняющий fsync для редких записей, не набравших пачку"""
+        while True:
+            await asyncio.sleep(self.fsync_interval)
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error(f"❌ Ошибка fsync журнала прогресса: {e}")
+
+    def close(self):
+        if self._journal is None:
+            return
+        self.compact()
+        self._journal.close()
+        self._journal = None
+
+
+class DeliveryWatermark:
+    """Номер, до которого всё найденное уже отправлено, хотя отправки завершаются не по порядку.
+
+    Редкие находки обгоняют обычные в очереди, а обычные ждут в сводках:
+    прогресс двигается только до номера перед самой ранней неотправленной находкой.
+    """
+
+    def __init__(self, committed: int = 0):
+        self.committed = committed
+        self._pending: Set[int] = set()
+        self._done: Set[int] = set()
+
+    def found(self, num: int):
+        self._pending.add(num)
+
+    def done(self, num: int) -> bool:
+        """Находка отправлена или окончательно отброшена; True — прогресс сдвинулся"""
+        self._pending.discard(num)
+        self._done.add(num)
+        lowest = min(self._pending, default=None)
+        ready = [n for n in self._done if lowest is None or n < lowest]
+        if not ready:
+            return False
+        self._done.difference_update(ready)
+        mark = max(ready)
+        if mark <= self.committed:
+            return False
+        self.committed = mark
+        return True
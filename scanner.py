@@ -0,0 +1,93 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from logging_config import setup_logger
+
+logger = setup_logger('scanner')
+
+ProbeResult = Tuple[Optional[int], Optional[Dict[str, Any]]]
+
+
+class WindowScanner:
+    """Держит в полёте окно номеров впереди последнего найденного минта"""
+
+    def __init__(self, probe: Callable[[int], Awaitable[ProbeResult]], start_num: int,
+                 window_initial: int = 4, window_min: int = 1, window_max: int = 32,
+                 idle_interval: float = 0.01,
+                 on_idle: Optional[Callable[[], Awaitable[None]]] = None,
+                 idle_delay: Optional[Callable[[], float]] = None,
+                 head_retries: int = 2):
+        self.probe = probe
+        self.next_num = start_num
+        self.window_min = max(1, window_min)
+        self.window_max = max(self.window_min, window_max)
+        self.window = min(max(window_initial, self.window_min), self.window_max)
+        self.idle_interval = idle_interval
+        self.on_idle = on_idle
+        # Пауза простоя от темпа минтов; без неё — фиксированный idle_interval
+        self.idle_delay = idle_delay
+        # Сколько раз перепроверить пустой головной номер, если дальше в окне есть минты
+        self.head_retries = max(0, head_retries)
+        self._head_misses = 0
+        self._inflight: Dict[int, asyncio.Task] = {}
+
+    def _fill(self):
+        """Догружает окно запросами до next_num + window"""
+        for num in range(self.next_num, self.next_num + self.window):
+            if num not in self._inflight:
+                self._inflight[num] = asyncio.create_task(self.probe(num))
+
+    def _grow(self):
+        self.window = min(self.window * 2, self.window_max)
+
+    def _shrink(self):
+        self.window = max(self.window // 2, self.window_min)
+
+    def close(self):
+        for task in self._inflight.values():
+            task.cancel()
+        self._inflight.clear()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Tuple[int, Dict[str, Any]]:
+        """Возвращает следующий найденный подарок строго по порядку номеров"""
+        while True:
+            self._fill()
+            head = self._inflight.pop(self.next_num)
+            _, result = await head
+            if result:
+                found_num = self.next_num
+                self.next_num += 1
+                self._head_misses = 0
+                self._grow()
+                return found_num, result
+
+            # Головной номер пуст: ждём остальное окно, чтобы понять,
+            # пропуск это в нумерации или мы упёрлись в фронтир
+            pending = list(self._inflight.values())
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+            has_later_hit = any(
+                not task.cancelled() and task.exception() is None and task.result()[1]
+                for task in pending
+            )
+            if has_later_hit:
+                # Запросы окна доходят до t.me в разное время: головной мог попасть
+                # за миг до минта, а следующий — уже после. Перепроверяем его
+                if self._head_misses < self.head_retries:
+                    self._head_misses += 1
+                    self._inflight[self.next_num] = asyncio.create_task(self.probe(self.next_num))
+                    continue
+                logger.debug("Пропуск номера #%s, дальше есть минты", self.next_num)
+                self.next_num += 1
+                self._head_misses = 0
+                continue
+
+            # Впереди пусто — сбрасываем окно и ждём новых минтов
+            self._inflight.clear()
+            self._head_misses = 0
+            self._shrink()
+            if self.on_idle:
+                await self.on_idle()
+            await asyncio.sleep(self.idle_delay() if self.idle_delay else self.idle_interval)
@@ -0,0 +1,298 @@
+import asyncio
+import itertools
+import math
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from delivery import TokenBucket
+from metrics import SCHEDULER_WAIT_SECONDS
+from logging_config import setup_logger
+
+logger = setup_logger('scheduler')
+
+ProbeResult = Tuple[Optional[int], Optional[Dict[str, Any]]]
+
+# Вид запроса в очереди: проверка номера или служебный запрос парсера
+PROBE = 'probe'
+
+
+class RetryLater(Exception):
+    """Проверка не удалась, но её стоит повторить через delay секунд"""
+
+    def __init__(self, delay: float):
+        super().__init__(delay)
+        self.delay = delay
+
+
+class DecayingRate:
+    """Скорость событий в секунду с экспоненциальным затуханием"""
+
+    def __init__(self, tau: float):
+        self.tau = tau
+        self.value = 0.0
+        self.updated = time.monotonic()
+
+    def _decay(self, now: float):
+        self.value *= math.exp(-(now - self.updated) / self.tau)
+        self.updated = now
+
+    def add(self, count: float = 1.0):
+        self._decay(time.monotonic())
+        self.value += count / self.tau
+
+    def get(self) -> float:
+        self._decay(time.monotonic())
+        return self.value
+
+
+class MintCadence:
+    """EWMA интервала между минтами и пауза простоя, выведенная из него.
+
+    Пока подарок не минтится, пауза растёт экспоненциально до max_delay.
+    Для активного подарка она не длиннее четверти среднего интервала,
+    а новый минт сразу сбрасывает её к min_delay.
+    """
+
+    def __init__(self, min_delay: float = 0.01, max_delay: float = 30.0,
+                 backoff: float = 2.0, alpha: float = 0.3):
+        self.min_delay = min_delay
+        self.max_delay = max(min_delay, max_delay)
+        self.backoff = backoff
+        self.alpha = alpha
+        self.mean_interval: Optional[float] = None
+        self.last_mint: Optional[float] = None
+        self.delay = min_delay
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> 'MintCadence':
+        return cls(settings['idle_interval'], settings['idle_max'],
+                   settings['idle_backoff'], settings['cadence_alpha'])
+
+    def on_mint(self):
+        now = time.monotonic()
+        if self.last_mint is not None:
+            interval = now - self.last_mint
+            if self.mean_interval is None:
+                self.mean_interval = interval
+            else:
+                self.mean_interval = self.alpha * interval + (1 - self.alpha) * self.mean_interval
+        self.last_mint = now
+        self.delay = self.min_delay
+
+    def idle_delay(self) -> float:
+        """Пауза перед следующим проходом после пустого"""
+        self.delay = min(self.delay * self.backoff, self.max_delay)
+        if self.mean_interval is not None and time.monotonic() - self.last_mint < 4 * self.mean_interval:
+            return max(self.min_delay, min(self.delay, self.mean_interval / 4))
+        return self.delay
+
+
+class GiftStats:
+    def __init__(self, gift_name: str, tau: float, cadence: Optional[MintCadence] = None):
+        self.gift_name = gift_name
+        self.probes = 0
+        self.hits = 0
+        # Служебные запросы подарка: счётчик выпущенных, поиск фронтира
+        self.service = 0
+        self.queued = 0
+        self.probe_rate = DecayingRate(tau)
+        self.mint_rate = DecayingRate(tau)
+        self.cadence = cadence or MintCadence()
+        # Лимит проверок номеров подарка в тихом режиме; None — без лимита.
+        # Служебные запросы его не тратят: их и так мало, и они уступают проверкам в очереди
+        self.throttle: Optional[TokenBucket] = None
+
+
+class CrawlScheduler:
+    """Общий бюджет запросов для всех подарков с приоритетом по скорости минтов.
+
+    Через него идут и проверки номеров (submit), и служебные запросы парсера
+    (call): счётчик выпущенных, поиск фронтира, премаркет, цены. Служебные
+    запросы уступают проверкам service_delay секунд очереди.
+
+    probe получает номер попытки и может бросить RetryLater: слот сразу
+    освобождается, а проверка встаёт в очередь заново после паузы.
+    """
+
+    def __init__(self, probe: Callable[[int, int, str, int], Awaitable[ProbeResult]],
+                 concurrency: int = 50, rate_window: float = 600.0, max_boost: float = 5.0,
+                 service_delay: float = 10.0):
+        self.probe = probe
+        self.concurrency = concurrency
+        self.rate_window = rate_window
+        # Насколько секунд «горячий» подарок может обогнать очередь
+        self.max_boost = max_boost
+        self.service_delay = service_delay
+        self.stats: Dict[int, GiftStats] = {}
+        # Выполненные запросы по видам, включая служебные без подарка
+        self.requests: Dict[str, int] = {}
+        self._queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._workers: List[asyncio.Task] = []
+        self._active = 0
+
+    def register(self, gift_id: int, gift_name: str, settings: Optional[Dict[str, Any]] = None) -> GiftStats:
+        stats = self.stats.get(gift_id)
+        if stats is None:
+            cadence = MintCadence.from_settings(settings) if settings else None
+            stats = GiftStats(gift_name, self.rate_window, cadence)
+            self.stats[gift_id] = stats
+        return stats
+
+    def start(self):
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    def set_concurrency(self, concurrency: int):
+        """Меняет число воркеров на лету; лишние завершаются после текущей проверки"""
+        self.concurrency = max(1, concurrency)
+        if not self._workers:
+            return
+        while len(self._workers) < self.concurrency:
+            self._workers.append(asyncio.create_task(self._worker()))
+
+    def set_probe_rate(self, gift_id: int, rate: Optional[float]):
+        stats = self.stats.get(gift_id)
+        if stats is None:
+            return
+        if not rate:
+            stats.throttle = None
+        elif stats.throttle is None:
+            stats.throttle = TokenBucket(rate, 1)
+        else:
+            stats.throttle.rate = rate
+
+    async def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def _priority(self, stats: GiftStats) -> float:
+        # Минты в минуту переводим в сдвиг очереди: 0 для спящих, до max_boost для горячих
+        mints_per_minute = stats.mint_rate.get() * 60
+        boost = self.max_boost * mints_per_minute / (mints_per_minute + 1)
+        return time.monotonic() - boost
+
+    async def _throttle(self, stats: GiftStats):
+        while stats.throttle is not None and stats.throttle.delay() > 0:
+            await asyncio.sleep(stats.throttle.delay())
+        if stats.throttle is not None:
+            stats.throttle.consume()
+
+    async def _enqueue(self, priority: float, gift_id: Optional[int], kind: str,
+                       job: Callable[[], Awaitable[Any]]) -> Any:
+        stats = self.stats.get(gift_id) if gift_id is not None else None
+        future = asyncio.get_running_loop().create_future()
+        if stats is not None:
+            stats.queued += 1
+        await self._queue.put((priority, next(self._seq), time.perf_counter(), gift_id, kind, job, future))
+        try:
+            return await future
+        finally:
+            if not future.done():
+                future.cancel()
+
+    async def submit(self, gift_id: int, num: int, url: str) -> ProbeResult:
+        """Ставит проверку номера в общую очередь и ждёт результат"""
+        stats = self.stats.get(gift_id) or self.register(gift_id, str(gift_id))
+        attempt = 0
+        while True:
+            await self._throttle(stats)
+            try:
+                return await self._enqueue(self._priority(stats), gift_id, PROBE,
+                                           lambda attempt=attempt: self.probe(gift_id, num, url, attempt))
+            except RetryLater as retry:
+                # Пауза перед повтором — вне очереди, воркер в это время проверяет другие номера
+                attempt += 1
+                await asyncio.sleep(retry.delay)
+
+    async def call(self, kind: str, func: Callable[..., Awaitable[Any]], *args,
+                   gift_id: Optional[int] = None, delay: Optional[float] = None) -> Any:
+        """Служебный запрос через общий бюджет; delay — сколько он уступает проверкам"""
+        stats = self.stats.get(gift_id) if gift_id is not None else None
+        if stats is not None:
+            priority = self._priority(stats)
+        else:
+            priority = time.monotonic()
+        priority += self.service_delay if delay is None else delay
+        return await self._enqueue(priority, gift_id, kind, lambda: func(*args))
+
+    async def _worker(self):
+        while True:
+            if len(self._workers) > self.concurrency:
+                self._workers.remove(asyncio.current_task())
+                return
+            _, _, queued_at, gift_id, kind, job, future = await self._queue.get()
+            stats = self.stats.get(gift_id) if gift_id is not None else None
+            if stats is not None:
+                stats.queued -= 1
+            if future.done():
+                continue
+            SCHEDULER_WAIT_SECONDS.observe(time.perf_counter() - queued_at)
+            self._active += 1
+            try:
+                self.requests[kind] = self.requests.get(kind, 0) + 1
+                if stats is not None:
+                    stats.probe_rate.add()
+                    if kind == PROBE:
+                        stats.probes += 1
+                    else:
+                        stats.service += 1
+                result = await job()
+                if kind == PROBE and result[1]:
+                    stats.hits += 1
+                    stats.mint_rate.add()
+                    stats.cadence.on_mint()
+                if not future.done():
+                    future.set_result(result)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._active -= 1
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Текущее распределение бюджета по подаркам; probes_per_sec считает и служебные запросы подарка"""
+        gifts = {}
+        for gift_id, stats in self.stats.items():
+            gifts[gift_id] = {
+                'name': stats.gift_name,
+                'probes': stats.probes,
+                'hits': stats.hits,
+                'service': stats.service,
+                'queued': stats.queued,
+                'probes_per_sec': round(stats.probe_rate.get(), 3),
+                'mints_per_min': round(stats.mint_rate.get() * 60, 3),
+                'mint_interval': round(stats.cadence.mean_interval, 1) if stats.cadence.mean_interval else None,
+                'idle_delay': round(stats.cadence.delay, 2),
+            }
+        return {
+            'queue_depth': self.queue_depth,
+            'active': self._active,
+            'concurrency': self.concurrency,
+            'requests': dict(self.requests),
+            'gifts': gifts,
+        }
+
+    async def report_loop(self, interval: float = 60.0, top: int = 5):
+        """Периодически пишет в лог, куда уходит бюджет запросов"""
+        while True:
+            await asyncio.sleep(interval)
+            snapshot = self.snapshot()
+            busiest = sorted(snapshot['gifts'].values(), key=lambda g: g['probes_per_sec'], reverse=True)[:top]
+            details = ', '.join(
+                f"{g['name']}: {g['probes_per_sec']}/с, служебных {g['service']}, "
+                f"минтов {g['mints_per_min']}/мин, в очереди {g['queued']}"
+                for g in busiest
+            )
+            logger.info(
+                f"📊 Очередь: {snapshot['queue_depth']}, в работе: {snapshot['active']}/{snapshot['concurrency']}. {details}"
+            )
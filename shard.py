@@ -0,0 +1,301 @@
+import asyncio
+import hashlib
+import sqlite3
+import time
+import zlib
+from bisect import bisect
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from logging_config import setup_logger
+
+logger = setup_logger('shard')
+
+# Несколько процессов (или хостов с общим каталогом) делят подарки через одну SQLite
+SHARD_SETTINGS = {
+    'lease_ttl': 30.0,         # аренда подарка и «пульс» воркера живут столько секунд
+    'renew_interval': 10.0,    # продление аренд и перераспределение
+    'virtual_nodes': 64,       # точек на кольце на воркер
+    'busy_timeout_ms': 1000,
+}
+
+# Аренда задачи, которую должен выполнять ровно один воркер
+PROMARKET_LEASE = 'promarket'
+
+ShardCallback = Callable[[int], Awaitable[None]]
+# Подарок, закреплённый другим воркером: добавить в свой конфиг до старта мониторинга
+AdoptCallback = Callable[[int, str], None]
+
+ACQUIRE_SQL = (
+    'INSERT INTO leases (name, owner, expires) VALUES (?, ?, ?) '
+    'ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires = excluded.expires '
+    'WHERE leases.owner = excluded.owner OR leases.expires < ?'
+)
+
+
+def shard_port(base: int, shard_id: str) -> int:
+    """Свой порт на шард: числовой SHARD_ID — base + id, остальные — по хешу имени"""
+    if not shard_id:
+        return base
+    if shard_id.isdigit():
+        return base + int(shard_id)
+    return base + 1 + zlib.crc32(shard_id.encode('utf-8')) % 1000
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """Консистентное хеширование: при уходе воркера переезжают только его подарки"""
+
+    def __init__(self, workers: Iterable[str], virtual_nodes: int = SHARD_SETTINGS['virtual_nodes']):
+        points = sorted(
+            (_hash(f"{worker}#{i}"), worker) for worker in set(workers) for i in range(virtual_nodes)
+        )
+        self._keys = [point for point, _ in points]
+        self._workers = [worker for _, worker in points]
+
+    def owner(self, key) -> Optional[str]:
+        if not self._keys:
+            return None
+        index = bisect(self._keys, _hash(str(key))) % len(self._keys)
+        return self._workers[index]
+
+
+class ShardCoordinator:
+    """Аренды подарков, общий прогресс и дедупликация отправок между воркерами.
+
+    Воркер держит подарок, пока продлевает аренду. Умерший воркер перестаёт
+    отмечаться, кольцо перестраивается без него, а после истечения аренд его
+    подарки забирают соседи и продолжают с общего прогресса.
+
+    Синхронные методы работают с базой напрямую и вызываются из потока базы.
+    Из event loop — только async-методы и advance(): busy_timeout при
+    конкуренции шардов не должен останавливать проверки.
+    """
+
+    def __init__(self, path: str, worker_id: str, settings: Optional[Dict[str, float]] = None):
+        self.path = path
+        self.worker_id = worker_id
+        self.settings = dict(SHARD_SETTINGS, **(settings or {}))
+        self.owned: Set[int] = set()
+        # Подарки, найденные этим воркером в премаркете: держим их, пока живы, кольцо их не отнимает
+        self.pinned: Set[int] = set()
+        # Служебные аренды (премаркет), продлеваются вместе с подарками
+        self.services: Set[str] = set()
+        # Один поток на базу: запросы идут по очереди и не держат цикл
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix='shard-db')
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(f"PRAGMA busy_timeout={int(self.settings['busy_timeout_ms'])}")
+        self.conn.executescript(
+            'CREATE TABLE IF NOT EXISTS workers (worker TEXT PRIMARY KEY, heartbeat REAL NOT NULL);'
+            'CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL);'
+            'CREATE TABLE IF NOT EXISTS progress (gift_id INTEGER PRIMARY KEY, num INTEGER NOT NULL);'
+            'CREATE TABLE IF NOT EXISTS delivered ('
+            ' gift_id INTEGER NOT NULL, num INTEGER NOT NULL, worker TEXT NOT NULL, at REAL NOT NULL,'
+            ' PRIMARY KEY (gift_id, num));'
+            'CREATE TABLE IF NOT EXISTS pinned ('
+            ' gift_id INTEGER PRIMARY KEY, url TEXT NOT NULL, worker TEXT NOT NULL, at REAL NOT NULL);'
+        )
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    @contextmanager
+    def _transaction(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        self.conn.execute('COMMIT')
+
+    # Воркеры и кольцо
+
+    def heartbeat(self):
+        self.conn.execute(
+            'INSERT INTO workers (worker, heartbeat) VALUES (?, ?) '
+            'ON CONFLICT(worker) DO UPDATE SET heartbeat = excluded.heartbeat',
+            (self.worker_id, time.time())
+        )
+
+    def live_workers(self) -> List[str]:
+        rows = self.conn.execute(
+            'SELECT worker FROM workers WHERE heartbeat >= ?', (time.time() - self.settings['lease_ttl'],)
+        )
+        workers = [worker for (worker,) in rows]
+        if self.worker_id not in workers:
+            workers.append(self.worker_id)
+        return workers
+
+    # Аренды
+
+    def acquire(self, name: str) -> bool:
+        """Берёт или продлевает аренду, если она свободна, истекла или уже наша"""
+        now = time.time()
+        self.conn.execute(ACQUIRE_SQL, (name, self.worker_id, now + self.settings['lease_ttl'], now))
+        row = self.conn.execute('SELECT owner FROM leases WHERE name = ?', (name,)).fetchone()
+        return row is not None and row[0] == self.worker_id
+
+    def release(self, name: str):
+        self.conn.execute('DELETE FROM leases WHERE name = ? AND owner = ?', (name, self.worker_id))
+
+    async def acquire_service(self, name: str) -> bool:
+        if await self._run(self.acquire, name):
+            self.services.add(name)
+            return True
+        self.services.discard(name)
+        return False
+
+    # Общий прогресс и отправки
+
+    async def progress(self, gift_id: int) -> int:
+        return await self._run(self._progress, gift_id)
+
+    def _progress(self, gift_id: int) -> int:
+        row = self.conn.execute('SELECT num FROM progress WHERE gift_id = ?', (gift_id,)).fetchone()
+        return row[0] if row else 0
+
+    def advance(self, gift_id: int, num: int):
+        """Запись прогресса уходит в поток базы, ждать её не нужно"""
+        self._executor.submit(self._advance, gift_id, num)
+
+    def _advance(self, gift_id: int, num: int):
+        try:
+            self.conn.execute(
+                'INSERT INTO progress (gift_id, num) VALUES (?, ?) '
+                'ON CONFLICT(gift_id) DO UPDATE SET num = MAX(num, excluded.num)',
+                (gift_id, num)
+            )
+        except Exception as e:
+            logger.error(f"❌ Ошибка записи общего прогресса {gift_id}: {e}")
+
+    async def claim(self, gift_id: int, num: int) -> bool:
+        """Застолбить отправку номера перед самой отправкой; False — его уже отправил другой воркер"""
+        return await self._run(self._claim, gift_id, num)
+
+    def _claim(self, gift_id: int, num: int) -> bool:
+        try:
+            cursor = self.conn.execute(
+                'INSERT OR IGNORE INTO delivered (gift_id, num, worker, at) VALUES (?, ?, ?, ?)',
+                (gift_id, num, self.worker_id, time.time())
+            )
+        except Exception as e:
+            # Без общей базы лучше отправить дубль, чем потерять находку
+            logger.error(f"❌ Ошибка дедупликации {gift_id}/#{num}: {e}")
+            return True
+        return cursor.rowcount == 1
+
+    def purge_delivered(self, max_age: float = 7 * 24 * 3600) -> int:
+        cursor = self.conn.execute('DELETE FROM delivered WHERE at < ?', (time.time() - max_age,))
+        return cursor.rowcount
+
+    # Распределение подарков
+
+    async def pin(self, gift_id: int, url: str) -> bool:
+        """Записывает подарок из премаркета в общую базу и берёт его себе; остальные шарды узнают о нём при перераспределении"""
+        if not await self._run(self._pin, gift_id, url):
+            return False
+        self.pinned.add(gift_id)
+        self.owned.add(gift_id)
+        return True
+
+    def _pin(self, gift_id: int, url: str) -> bool:
+        with self._transaction():
+            self.conn.execute(
+                'INSERT OR IGNORE INTO pinned (gift_id, url, worker, at) VALUES (?, ?, ?, ?)',
+                (gift_id, url, self.worker_id, time.time())
+            )
+            row = self.conn.execute('SELECT url FROM pinned WHERE gift_id = ?', (gift_id,)).fetchone()
+            if row[0] != url:
+                logger.warning(f"⚠️ Id {gift_id} уже занят подарком {row[0]}")
+                return False
+            return self.acquire(f"gift:{gift_id}")
+
+    def _sync_leases(self, known: Set[int], owned: Set[int], pinned: Set[int],
+                     services: Set[str], merge_shared: bool = False) -> Tuple[Set[int], Set[str], Dict[int, str]]:
+        """Один проход в одной транзакции: пульс, продление своих аренд, захват своих по кольцу"""
+        now = time.time()
+        expires = now + self.settings['lease_ttl']
+        with self._transaction():
+            self.heartbeat()
+            # Подарки из премаркета есть только у нашедшего их воркера: кандидаты у всех общие
+            shared = dict(self.conn.execute('SELECT gift_id, url FROM pinned'))
+            if merge_shared:
+                known = known | set(shared)
+            # Все свои аренды — подарки и служебные — продлеваются одним запросом
+            self.conn.execute('UPDATE leases SET expires = ? WHERE owner = ?', (expires, self.worker_id))
+            ring = HashRing(self.live_workers(), int(self.settings['virtual_nodes']))
+            wanted = {gift_id for gift_id in known if ring.owner(gift_id) == self.worker_id} | (pinned & known)
+            self.conn.executemany(ACQUIRE_SQL, [
+                (f"gift:{gift_id}", self.worker_id, expires, now) for gift_id in sorted(wanted - owned)
+            ] + [(name, self.worker_id, expires, now) for name in sorted(services)])
+            held = {name for (name,) in self.conn.execute('SELECT name FROM leases WHERE owner = ?',
+                                                          (self.worker_id,))}
+        return wanted, held, shared
+
+    def _release_gifts(self, gift_ids: List[int]):
+        with self._transaction():
+            self.conn.executemany('DELETE FROM leases WHERE name = ? AND owner = ?',
+                                  [(f"gift:{gift_id}", self.worker_id) for gift_id in gift_ids])
+
+    async def rebalance(self, gift_ids: Iterable[int], start: ShardCallback, stop: ShardCallback,
+                        adopt: Optional[AdoptCallback] = None):
+        """Продлевает свои аренды, отдаёт чужие по кольцу подарки и забирает свободные свои"""
+        gift_ids = set(gift_ids)
+        wanted, held, shared = await self._run(
+            self._sync_leases, gift_ids, set(self.owned), set(self.pinned), set(self.services), adopt is not None
+        )
+        if adopt is not None:
+            for gift_id in sorted(set(shared) - gift_ids):
+                adopt(gift_id, shared[gift_id])
+        self.services &= held
+        held_gifts = {int(name[5:]) for name in held if name.startswith('gift:')}
+
+        handed_over = sorted(self.owned - wanted)
+        for gift_id in handed_over:
+            self.owned.discard(gift_id)
+            self.pinned.discard(gift_id)
+            await stop(gift_id)
+        if handed_over:
+            await self._run(self._release_gifts, handed_over)
+            logger.info(f"↪️ Передано другим воркерам подарков: {len(handed_over)}")
+        for gift_id in sorted(self.owned - held_gifts):
+            # Аренду перехватили, пока мы не продлевали: отдаём подарок
+            self.owned.discard(gift_id)
+            self.pinned.discard(gift_id)
+            await stop(gift_id)
+            logger.warning(f"⚠️ Аренда подарка {gift_id} потеряна")
+        taken = sorted((wanted & held_gifts) - self.owned)
+        for gift_id in taken:
+            self.owned.add(gift_id)
+            await start(gift_id)
+        if taken:
+            logger.info(f"🧩 Воркер {self.worker_id} взял подарков: {len(taken)}, всего {len(self.owned)}")
+
+    async def run(self, get_gift_ids: Callable[[], Iterable[int]], start: ShardCallback, stop: ShardCallback,
+                  adopt: Optional[AdoptCallback] = None):
+        # Сначала только отмечаемся и ждём один интервал: шарды, запущенные вместе,
+        # успевают увидеть друг друга, и первый не забирает все подарки себе
+        await self._run(self.heartbeat)
+        await asyncio.sleep(self.settings['renew_interval'])
+        while True:
+            try:
+                await self.rebalance(list(get_gift_ids()), start, stop, adopt)
+            except Exception as e:
+                logger.error(f"❌ Ошибка перераспределения подарков: {e}")
+            await asyncio.sleep(self.settings['renew_interval'])
+
+    def close(self):
+        """Дописывает прогресс и отпускает аренды сразу, не дожидаясь их истечения"""
+        self._executor.shutdown(wait=True)
+        try:
+            self.conn.execute('DELETE FROM leases WHERE owner = ?', (self.worker_id,))
+            self.conn.execute('DELETE FROM workers WHERE worker = ?', (self.worker_id,))
+        except Exception as e:
+            logger.error(f"❌ Ошибка освобождения аренд: {e}")
+        self.conn.close()
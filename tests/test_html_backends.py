@@ -0,0 +1,29 @@
+"""Каждый установленный HTML бэкенд даёт на фикстурах t.me тот же GiftRecord, что и BeautifulSoup"""
+import glob
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from html_backends import available_backends, get_backend
+
+FIXTURES = sorted(glob.glob(os.path.join(ROOT, 'benchmarks', 'fixtures', 'tme_*.html')))
+
+
+def read(path: str) -> str:
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_fixtures_present():
+    assert FIXTURES
+
+
+@pytest.mark.parametrize('backend_name', [name for name in available_backends() if name != 'bs4'])
+@pytest.mark.parametrize('fixture', FIXTURES, ids=os.path.basename)
+def test_backend_matches_bs4(backend_name, fixture):
+    text = read(fixture)
+    assert get_backend(backend_name).parse(text) == get_backend('bs4').parse(text)
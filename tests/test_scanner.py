@@ -0,0 +1,76 @@
+"""WindowScanner на поддельной проверке номеров, без сети"""
+import asyncio
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from scanner import WindowScanner
+
+
+class FakeCheck:
+    """Номер из minted находится; номер из late — только со второй проверки"""
+
+    def __init__(self, minted, late=()):
+        self.minted = set(minted)
+        self.late = set(late)
+        self.calls = {}
+
+    async def __call__(self, num):
+        self.calls[num] = self.calls.get(num, 0) + 1
+        await asyncio.sleep(0)
+        if num in self.late and self.calls[num] == 1:
+            return None, None
+        if num in self.minted:
+            return num, {'num': num}
+        return None, None
+
+
+async def collect(scanner, count, timeout=2.0):
+    """Первые count находок; пропущенный минт даёт таймаут, а не зависание"""
+    found = []
+
+    async def run():
+        async for num, _ in scanner:
+            found.append(num)
+            if len(found) == count:
+                return
+
+    try:
+        await asyncio.wait_for(run(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        scanner.close()
+    return found
+
+
+def test_head_missed_once_is_reprobed():
+    check = FakeCheck(minted=range(1, 6), late={1})
+    found = asyncio.run(collect(WindowScanner(check, 1, window_initial=4), 5))
+    assert found == [1, 2, 3, 4, 5]
+    assert check.calls[1] == 2
+
+
+def test_real_gap_is_skipped_after_retries():
+    check = FakeCheck(minted={1, 3, 4})
+    found = asyncio.run(collect(WindowScanner(check, 1, window_initial=4, head_retries=2), 3))
+    assert found == [1, 3, 4]
+    assert check.calls[2] == 3
+
+
+def test_empty_window_goes_idle():
+    check = FakeCheck(minted={1})
+    idle = []
+
+    async def on_idle():
+        idle.append(True)
+        scanner.close()
+        raise StopAsyncIteration
+
+    scanner = WindowScanner(check, 1, window_initial=2, on_idle=on_idle, idle_interval=0)
+    found = asyncio.run(collect(scanner, 2))
+    assert found == [1]
+    assert idle == [True]
+    assert scanner.window == 2
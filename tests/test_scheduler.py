@@ -0,0 +1,34 @@
+"""CrawlScheduler на поддельной проверке номеров, без сети"""
+import asyncio
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from scheduler import CrawlScheduler, RetryLater
+
+
+def test_retry_releases_the_slot():
+    """Пока упавшая проверка ждёт повтора, единственный воркер проверяет остальные номера"""
+    calls = []
+
+    async def probe(gift_id, num, url, attempt):
+        calls.append((num, attempt))
+        if num == 1 and attempt == 0:
+            raise RetryLater(0.2)
+        return (num, {'num': num}) if num == 1 else (None, None)
+
+    async def run():
+        scheduler = CrawlScheduler(probe, concurrency=1)
+        scheduler.start()
+        try:
+            return await asyncio.wait_for(
+                asyncio.gather(*[scheduler.submit(1, num, 'url') for num in (1, 2, 3)]), 2.0
+            )
+        finally:
+            await scheduler.stop()
+
+    results = asyncio.run(run())
+    assert results == [(1, {'num': 1}), (None, None), (None, None)]
+    assert calls == [(1, 0), (2, 0), (3, 0), (1, 1)]